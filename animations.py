@@ -1,4 +1,6 @@
 import math
+from functools import lru_cache
+from typing import Tuple
 
 import pygame
 
@@ -70,8 +72,6 @@ class UnitDeathAnimation(UnitAnimation):
         # Progress of the animation (0.0 to 1.0)
         t = min(animation_frame / total_frames, 1.0)
 
-        alpha = max(0, int(255 * (1 - t)))
-
         angle = 2 * math.pi * t * 2
         radius = TILE_SIZE * t
         offset_x = math.cos(angle) * radius
@@ -83,8 +83,7 @@ class UnitDeathAnimation(UnitAnimation):
         render_x = self.x + offset_x
         render_y = self.y + offset_y + fall_offset
 
-        unit_image = self.unit.get_image().copy()
-        unit_image.set_alpha(alpha)
+        unit_image = get_fade_frames(self.unit.team, self.unit.type, self.unit.direction)[fade_frame(animation_frame)]
 
         # Draw the unit with applied transformations
         screen.blit(unit_image, (render_x, render_y))
@@ -97,24 +96,36 @@ class UnitWinAnimation(UnitAnimation):
 
         end_x, end_y = self.x, self.y - TILE_SIZE
 
-        total_frames = 15
-
         def animation_curve(t: float):
             return 1 - ((10/9) * (1 - pow(10, t-1)))
 
-        t = min(animation_frame / total_frames, 1.0)
-
-        alpha = max(0, int(255 * (1 - t)))
-
         # For the last 3 frames, it's just chilling in the next square over, not moving at all.
         render_y = (end_y - self.y) * animation_curve(animation_frame/15) + self.y
 
-        image = self.unit.get_image().copy()
-        image.set_alpha(alpha)
+        image = get_fade_frames(self.unit.team, self.unit.type, self.unit.direction)[fade_frame(animation_frame)]
 
         screen.blit(image, (self.x, render_y))
 
 
+FADE_FRAMES = 15
+
+
+@lru_cache(maxsize=32)
+def get_fade_frames(team: Team, unit_type: UnitType, direction: Direction) -> Tuple[pygame.Surface, ...]:
+    "The sprite at every alpha of the death and win fades, from opaque to gone"
+    image = Unit(unit_type, direction, team).get_image()
+    frames = []
+    for animation_frame in range(FADE_FRAMES + 1):
+        frame = image.copy()
+        frame.set_alpha(int(255 * (1 - animation_frame / FADE_FRAMES)))
+        frames.append(frame)
+    return tuple(frames)
+
+
+def fade_frame(animation_frame: int) -> int:
+    return min(max(int(animation_frame), 0), FADE_FRAMES)
+
+
 class FlankAnimation(Animation):
     def __init__(self, start_frame: int, start_y: int, end_y: int, x: int):
         self.start_y = start_y
@@ -122,23 +133,31 @@ class FlankAnimation(Animation):
         self.x = x
         self.start_frame = start_frame
 
-    def draw(self, screen: pygame.Surface, current_frame: int, game_state: GameMode):
+    def draw(self, screen: pygame.Surface, current_frame: float, game_state: GameMode):
+        # The pulse only needs whole-frame phases, so it doesn't follow the play clock's fractions
+        current_frame = math.floor(current_frame)
         if game_state == GameMode.EDIT_TROOPS:
             t = ((current_frame - self.start_frame) % 30) / 30
             alpha = int(200 * (math.sin(t*math.pi*2)+1)/2)
         else:
             t = ((current_frame - self.start_frame) % 15) / 15
             alpha = int(200 * min(1, 2 * pow(t, 2)))
-        color = (255, 128, 0)
-
-        # Create a surface with per-pixel alpha
-        temp_surface = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+        height = self.end_y - self.start_y - 16
+        if height <= 0:
+            # A run cut short by an enemy unit can end above where it starts, and there is no outline to draw
+            return
+        alpha = alpha // FLANK_ALPHA_STEP * FLANK_ALPHA_STEP
+        screen.blit(get_flank_outline(height, alpha), (self.x + 8, self.start_y + 8))
 
-        # Draw the rectangle on the temporary surface
-        rect = pygame.Rect(self.x + 8, self.start_y + 8, TILE_SIZE - 16, self.end_y - self.start_y - 16)
-        pygame.draw.rect(temp_surface, (*color, alpha), rect, width=4)
 
-        # Blit the temporary surface onto the main screen
-        screen.blit(temp_surface, (0, 0))
+FLANK_ALPHA_STEP = 8  # The pulse's alpha is rounded down to a multiple of this, so it takes at most 26 values
 
 
+# Flanks come in a few lengths, so with the alpha bucketed every frame after the first pulse is drawn from here rather
+# than a fresh surface. The limit keeps a long session on a board with many flank lengths from holding on to them all.
+@lru_cache(maxsize=128)
+def get_flank_outline(height: int, alpha: int) -> pygame.Surface:
+    color = (255, 128, 0)
+    outline = pygame.Surface((TILE_SIZE - 16, height), pygame.SRCALPHA)
+    pygame.draw.rect(outline, (*color, alpha), outline.get_rect(), width=4)
+    return outline
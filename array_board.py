@@ -0,0 +1,381 @@
+import hashlib
+from typing import List, Optional, Self, Tuple, Set, Dict
+
+import numpy as np
+
+from board import Board
+from chains import resolve_chains
+from conflicts import Conflict, Claim, find_conflicts
+from unit import Tile, Team, TileType, Unit, UnitType, Direction
+
+
+TILE_TYPES: List[TileType] = list(TileType)
+TILE_TYPE_CODES: Dict[TileType, int] = {tile_type: code for code, tile_type in enumerate(TILE_TYPES)}
+PASSABLE = np.array([tile_type.value.is_passable for tile_type in TILE_TYPES])
+
+GRASS = TILE_TYPE_CODES[TileType.GRASS]
+TRAMPOLINE = TILE_TYPE_CODES[TileType.TRAMPOLINE]
+WALL = TILE_TYPE_CODES[TileType.WALL]
+DEADWALL = TILE_TYPE_CODES[TileType.DEADWALL]
+TRAPDOOR = TILE_TYPE_CODES[TileType.TRAPDOOR]
+FINISH_LINE = TILE_TYPE_CODES[TileType.FINISH_LINE]
+TUNNEL = TILE_TYPE_CODES[TileType.TUNNEL]
+
+# Clockwise order, so rotating clockwise is +1 mod 4 and horizontal directions have odd codes
+DIRECTIONS: List[Direction] = [Direction.UP, Direction.RIGHT, Direction.DOWN, Direction.LEFT]
+DIRECTION_CODES: Dict[Direction, int] = {direction: code for code, direction in enumerate(DIRECTIONS)}
+ROW_STEP = np.array([-1, 0, 1, 0])
+COL_STEP = np.array([0, 1, 0, -1])
+
+TEAMS: List[Team] = list(Team)
+TEAM_CODES: Dict[Team, int] = {team: code for code, team in enumerate(TEAMS)}
+NO_UNIT = -1
+
+
+class ArrayBoard:
+    """
+    Board backend that keeps terrain and units in parallel NumPy arrays instead of Tile/Unit objects.
+    update() follows the same rules as Board.update, tick for tick, but has no renderer hooks.
+    """
+
+    def __init__(self, tile_type: np.ndarray, placeable: np.ndarray, health: np.ndarray, rotation: np.ndarray,
+                 destination: np.ndarray, unit_team: np.ndarray, unit_type: np.ndarray, unit_direction: np.ndarray,
+                 unit_defense: np.ndarray):
+        self.tile_type = tile_type
+        self.placeable = placeable
+        self.health = health
+        self.rotation = rotation
+        self.destination = destination
+        self.unit_team = unit_team
+        self.unit_type = unit_type
+        self.unit_direction = unit_direction
+        self.unit_defense = unit_defense
+        self.finished_units_by_team = {
+            team: 0
+            for team in Team
+        }
+        self.units_killed_by_team = {
+            team: 0
+            for team in Team
+        }
+        self.updates = 0
+        self.seen_states: Set[bytes] = {self.get_state_key()}
+        self.repeated_state = False
+
+    @classmethod
+    def from_board(cls, board: Board) -> Self:
+        height, width = len(board.tiles), len(board.tiles[0])
+        array_board = ArrayBoard(
+            np.empty((height, width), dtype=np.int8),
+            np.empty((height, width), dtype=bool),
+            np.empty((height, width), dtype=np.int32),
+            np.empty((height, width), dtype=np.int8),
+            np.empty((height, width, 2), dtype=np.int32),
+            np.full((height, width), NO_UNIT, dtype=np.int8),
+            np.zeros((height, width), dtype=np.int8),
+            np.zeros((height, width), dtype=np.int8),
+            np.ones((height, width), dtype=np.int8),
+        )
+        for row_idx, row in enumerate(board.tiles):
+            for col_idx, tile in enumerate(row):
+                array_board.tile_type[row_idx, col_idx] = TILE_TYPE_CODES[tile.type]
+                array_board.placeable[row_idx, col_idx] = tile.is_placeable
+                array_board.health[row_idx, col_idx] = tile.health
+                array_board.rotation[row_idx, col_idx] = DIRECTION_CODES[tile.rotation]
+                array_board.destination[row_idx, col_idx] = tile.destination
+                if tile.unit is not None:
+                    array_board.unit_team[row_idx, col_idx] = TEAM_CODES[tile.unit.team]
+                    array_board.unit_type[row_idx, col_idx] = tile.unit.type.value
+                    array_board.unit_direction[row_idx, col_idx] = DIRECTION_CODES[tile.unit.direction]
+                    array_board.unit_defense[row_idx, col_idx] = tile.unit.defense
+        array_board.finished_units_by_team = dict(board.finished_units_by_team)
+        array_board.units_killed_by_team = dict(board.units_killed_by_team)
+        array_board.updates = board.updates
+        array_board.seen_states = {array_board.get_state_key()}
+        return array_board
+
+    @classmethod
+    def from_serialized(cls, serialized_data: List[List[Dict[str, Optional[Dict[str, int | str]] | bool | int | str | Tuple[int]]]]) -> Self:
+        return ArrayBoard.from_board(Board.from_serialized(serialized_data))
+
+    def to_board(self) -> Board:
+        tiles = []
+        for row_idx in range(self.tile_type.shape[0]):
+            tile_row = []
+            for col_idx in range(self.tile_type.shape[1]):
+                unit = None
+                if self.unit_team[row_idx, col_idx] != NO_UNIT:
+                    unit = Unit(UnitType(int(self.unit_type[row_idx, col_idx])),
+                                DIRECTIONS[self.unit_direction[row_idx, col_idx]],
+                                TEAMS[self.unit_team[row_idx, col_idx]])
+                    unit.defense = int(self.unit_defense[row_idx, col_idx])
+                tile_row.append(Tile(TILE_TYPES[self.tile_type[row_idx, col_idx]], unit,
+                                     bool(self.placeable[row_idx, col_idx]), int(self.health[row_idx, col_idx]),
+                                     DIRECTIONS[self.rotation[row_idx, col_idx]],
+                                     tuple(int(i) for i in self.destination[row_idx, col_idx])))
+            tiles.append(tile_row)
+        board = Board(tiles)
+        board.finished_units_by_team = dict(self.finished_units_by_team)
+        board.units_killed_by_team = dict(self.units_killed_by_team)
+        board.updates = self.updates
+        return board
+
+    def get_state_key(self) -> bytes:
+        "Digest of what Board.update hashes: each square's terrain type and health, and its unit's team and direction"
+        digest = hashlib.blake2b(digest_size=16)
+        for array in (self.tile_type, self.health, self.unit_team, self.unit_direction):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.digest()
+
+    def get_faced_squares(self, unit_direction: np.ndarray = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Gets the square faced by a unit on every square of the board, as row and column arrays plus an in-bounds mask.
+        Squares without a unit still get an entry, which callers mask out.
+        """
+        if unit_direction is None:
+            unit_direction = self.unit_direction
+        height, width = self.tile_type.shape
+        rows, cols = np.indices((height, width))
+        faced_rows = rows + ROW_STEP[unit_direction]
+        faced_cols = cols + COL_STEP[unit_direction]
+        in_bounds = (0 <= faced_rows) & (faced_rows < height) & (0 <= faced_cols) & (faced_cols < width)
+        return faced_rows, faced_cols, in_bounds
+
+    def update(self) -> bool:
+        "Returns whether the board reached a state it hasn't been in before, like Board.update"
+        self.updates += 1
+        height, width = self.tile_type.shape
+        previous_state_key = self.get_state_key()
+
+        faced_rows, faced_cols, in_bounds = self.get_faced_squares()
+        chains, locked_units = self.identify_chains(faced_rows, faced_cols, in_bounds)
+
+        # Units are tracked by the flat index of the square they start the tick on
+        old_ids = np.where(self.unit_team != NO_UNIT, np.arange(height * width).reshape(height, width), NO_UNIT)
+        team_by_id = self.unit_team.ravel().copy()
+        type_by_id = self.unit_type.ravel().copy()
+        defense_by_id = self.unit_defense.ravel().copy()
+        direction_by_id = self.unit_direction.ravel().copy()
+
+        new_ids = np.full((height, width), NO_UNIT)
+
+        moved = [point for chain in chains for point in chain]
+        if moved:
+            moved_rows, moved_cols = np.array(moved).T
+            self._scatter_last_wins(new_ids, faced_rows[moved_rows, moved_cols], faced_cols[moved_rows, moved_cols],
+                                    old_ids[moved_rows, moved_cols])
+
+        if locked_units:
+            locked_rows, locked_cols = np.array(list(locked_units)).T
+            at_finish = self.tile_type[locked_rows, locked_cols] == FINISH_LINE
+            new_ids[locked_rows[~at_finish], locked_cols[~at_finish]] = old_ids[locked_rows[~at_finish], locked_cols[~at_finish]]
+            finished = np.bincount(self.unit_team[locked_rows[at_finish], locked_cols[at_finish]], minlength=len(TEAMS))
+            for team_code, team in enumerate(TEAMS):
+                self.finished_units_by_team[team] += int(finished[team_code])
+
+        occupied_types = self.tile_type[new_ids != NO_UNIT]
+        if np.any((occupied_types == TUNNEL) | (occupied_types == WALL)):
+            self._apply_tile_effects_in_order(new_ids, team_by_id, type_by_id, direction_by_id)
+        else:
+            self._apply_tile_effects(new_ids, team_by_id, type_by_id, direction_by_id)
+
+        occupied = new_ids != NO_UNIT
+        self.unit_team = np.where(occupied, team_by_id[new_ids], NO_UNIT).astype(np.int8)
+        self.unit_type = np.where(occupied, type_by_id[new_ids], 0).astype(np.int8)
+        self.unit_defense = np.where(occupied, defense_by_id[new_ids], 1).astype(np.int8)
+        self.unit_direction = np.where(occupied, direction_by_id[new_ids], 0).astype(np.int8)
+
+        state_key = self.get_state_key()
+        change = state_key not in self.seen_states
+        self.repeated_state = not change and state_key != previous_state_key
+        self.seen_states.add(state_key)
+
+        # Now, we update each troop's strength and defense
+        self.update_strength_defense()
+        return change
+
+    @staticmethod
+    def _scatter_last_wins(target: np.ndarray, rows: np.ndarray, cols: np.ndarray, values: np.ndarray):
+        "Assigns values in order, so the last of several writes to one square wins, as with sequential assignment"
+        flat = rows * target.shape[1] + cols
+        _, last_from_end = np.unique(flat[::-1], return_index=True)
+        keep = len(flat) - 1 - last_from_end
+        target.ravel()[flat[keep]] = values[keep]
+
+    def _bounce(self, rows: np.ndarray, cols: np.ndarray, ids: np.ndarray, direction_by_id: np.ndarray):
+        on_trampoline = self.tile_type[rows, cols] == TRAMPOLINE
+        bounced_ids = ids[on_trampoline]
+        tile_horizontal = self.rotation[rows[on_trampoline], cols[on_trampoline]] % 2 == 1
+        unit_horizontal = direction_by_id[bounced_ids] % 2 == 1
+        direction_by_id[bounced_ids] = (direction_by_id[bounced_ids] + np.where(tile_horizontal == unit_horizontal, -1, 1)) % 4
+
+    def _break_walls(self, wall_rows: np.ndarray, wall_cols: np.ndarray, damage: np.ndarray):
+        total_damage = np.zeros(self.tile_type.shape, dtype=np.int32)
+        np.add.at(total_damage, (wall_rows, wall_cols), damage)
+        hit = total_damage > 0
+        # Hits are applied one at a time until one is at least the remaining health, which happens iff the total is
+        broken = hit & (total_damage >= self.health)
+        self.health = np.where(hit & ~broken, self.health - total_damage, self.health)
+        self.tile_type[broken] = DEADWALL
+        self.health[broken] = 5
+        self.rotation[broken] = DIRECTION_CODES[Direction.RIGHT]
+        self.destination[broken] = (5, 5)
+
+    def _apply_tile_effects(self, new_ids: np.ndarray, team_by_id: np.ndarray, type_by_id: np.ndarray,
+                            direction_by_id: np.ndarray):
+        "Trampolines, lava and wall damage as whole-array operations, for boards where no unit stands on a tunnel or wall"
+        rows, cols = np.nonzero(new_ids != NO_UNIT)
+        ids = new_ids[rows, cols]
+
+        # Trampolines
+        self._bounce(rows, cols, ids, direction_by_id)
+
+        # Lava
+        on_lava = self.tile_type[rows, cols] == TRAPDOOR
+        killed = np.bincount(team_by_id[ids[on_lava]], minlength=len(TEAMS))
+        for team_code, team in enumerate(TEAMS):
+            self.units_killed_by_team[team] += int(killed[team_code])
+        new_ids[rows[on_lava], cols[on_lava]] = NO_UNIT
+
+        # Walls
+        rows, cols, ids = rows[~on_lava], cols[~on_lava], ids[~on_lava]
+        directions = direction_by_id[ids]
+        faced_rows, faced_cols = rows + ROW_STEP[directions], cols + COL_STEP[directions]
+        height, width = self.tile_type.shape
+        in_bounds = (0 <= faced_rows) & (faced_rows < height) & (0 <= faced_cols) & (faced_cols < width)
+        faced_rows, faced_cols, ids = faced_rows[in_bounds], faced_cols[in_bounds], ids[in_bounds]
+        facing_wall = self.tile_type[faced_rows, faced_cols] == WALL
+        self._break_walls(faced_rows[facing_wall], faced_cols[facing_wall], type_by_id[ids[facing_wall]])
+
+    def _apply_tile_effects_in_order(self, new_ids: np.ndarray, team_by_id: np.ndarray, type_by_id: np.ndarray,
+                                     direction_by_id: np.ndarray):
+        """
+        Tunnels drop units onto squares that may not have been visited yet, and a broken wall clears anything standing
+        on it, so those boards are walked square by square in the same order as Board.update
+        """
+        height, width = self.tile_type.shape
+        for row_idx in range(height):
+            for col_idx in range(width):
+                unit_id = new_ids[row_idx, col_idx]
+                if unit_id == NO_UNIT:
+                    continue
+                tile_type = self.tile_type[row_idx, col_idx]
+                if tile_type == TRAMPOLINE:
+                    tile_horizontal = self.rotation[row_idx, col_idx] % 2 == 1
+                    unit_horizontal = direction_by_id[unit_id] % 2 == 1
+                    direction_by_id[unit_id] = (direction_by_id[unit_id] + (-1 if tile_horizontal == unit_horizontal else 1)) % 4
+                if tile_type == TRAPDOOR:
+                    self.units_killed_by_team[TEAMS[team_by_id[unit_id]]] += 1
+                    new_ids[row_idx, col_idx] = NO_UNIT
+                elif tile_type == TUNNEL:
+                    dest_row, dest_col = self.destination[row_idx, col_idx]
+                    new_ids[dest_row, dest_col] = unit_id
+                    new_ids[row_idx, col_idx] = NO_UNIT
+                else:
+                    direction = direction_by_id[unit_id]
+                    faced_row, faced_col = row_idx + ROW_STEP[direction], col_idx + COL_STEP[direction]
+                    if 0 <= faced_row < height and 0 <= faced_col < width and self.tile_type[faced_row, faced_col] == WALL:
+                        if self.health[faced_row, faced_col] > type_by_id[unit_id]:
+                            self.health[faced_row, faced_col] -= type_by_id[unit_id]
+                        else:
+                            self.tile_type[faced_row, faced_col] = DEADWALL
+                            self.health[faced_row, faced_col] = 5
+                            self.rotation[faced_row, faced_col] = DIRECTION_CODES[Direction.RIGHT]
+                            self.destination[faced_row, faced_col] = (5, 5)
+                            new_ids[faced_row, faced_col] = NO_UNIT
+
+    def update_strength_defense(self):
+        # Strength comes from the run of same-team units along the row, defense from the run down the column
+        occupied = self.unit_team != NO_UNIT
+        self.unit_type = np.where(occupied, np.minimum(4, self._run_lengths(self.unit_team)), self.unit_type).astype(np.int8)
+        self.unit_defense = np.where(occupied, np.minimum(5, self._run_lengths(self.unit_team.T).T), self.unit_defense).astype(np.int8)
+
+    @staticmethod
+    def _run_lengths(unit_team: np.ndarray) -> np.ndarray:
+        "Length of the run of same-team units along each row that each square belongs to"
+        starts = np.ones(unit_team.shape, dtype=bool)
+        starts[:, 1:] = (unit_team[:, 1:] != unit_team[:, :-1]) | (unit_team[:, 1:] == NO_UNIT)
+        run_ids = np.cumsum(starts.ravel()) - 1
+        return np.bincount(run_ids)[run_ids].reshape(unit_team.shape)
+
+    def identify_chains(self, faced_rows: np.ndarray, faced_cols: np.ndarray, in_bounds: np.ndarray) -> \
+            Tuple[List[List[Tuple[int, int]]], Set[Tuple[int, int]]]:
+        """
+        Array version of Board.identify_chains. Kills the losers of every conflict in place and returns the chains and
+        the locked units.
+        """
+        occupied = self.unit_team != NO_UNIT
+        claiming = occupied & in_bounds
+        claiming[claiming] = PASSABLE[self.tile_type[faced_rows[claiming], faced_cols[claiming]]]
+        unit_rows, unit_cols = np.nonzero(claiming)
+
+        conflicts, stuck_unit_points = find_conflicts(
+            (Claim((row_idx, col_idx), unit_team, (f_row_idx, f_col_idx))
+             for row_idx, col_idx, f_row_idx, f_col_idx, unit_team in zip(
+                unit_rows.tolist(), unit_cols.tolist(), faced_rows[claiming].tolist(), faced_cols[claiming].tolist(),
+                self.unit_team[claiming].tolist())),
+            list(range(len(TEAMS)))
+        )
+
+        for conflict in conflicts.values():
+            survivor_coordinates = self.resolve_conflict(conflict)
+            for b_point in conflict.belligerent_coordinates:
+                if b_point not in survivor_coordinates:
+                    self.unit_team[b_point] = NO_UNIT
+
+        occupied = self.unit_team != NO_UNIT
+        unit_rows, unit_cols = np.nonzero(occupied)
+        facing = {
+            (row_idx, col_idx): (f_row_idx, f_col_idx) if is_claiming else None
+            for row_idx, col_idx, f_row_idx, f_col_idx, is_claiming in zip(
+                unit_rows.tolist(), unit_cols.tolist(), faced_rows[occupied].tolist(), faced_cols[occupied].tolist(),
+                claiming[occupied].tolist())
+        }
+
+        return resolve_chains(facing, stuck_unit_points)
+
+    def resolve_conflict(self, conflict: Conflict) -> Set[Tuple[int, int]]:
+        team_damage = {team_code: 0 for team_code in range(len(TEAMS))}
+        sorted_belligerents = sorted(
+            [c for c in conflict.belligerent_coordinates if self.unit_team[c] != NO_UNIT],
+            key=lambda coordinate: self.unit_defense[coordinate],
+            reverse=True
+        )
+
+        for b_point in sorted_belligerents:
+            for team_code in team_damage:
+                if team_code != self.unit_team[b_point]:
+                    team_damage[team_code] += int(self.unit_type[b_point])
+
+        survivors = set()
+        weakest_unit_coordinates = []
+        weakest_unit_damage = -1
+
+        for b_point in sorted_belligerents:
+            unit_team, defense = int(self.unit_team[b_point]), int(self.unit_defense[b_point])
+
+            exact_damage = team_damage[unit_team] / defense
+            damage = team_damage[unit_team] // defense
+
+            team_damage[unit_team] = max(team_damage[unit_team] - defense, 0)
+
+            if exact_damage > weakest_unit_damage:
+                weakest_unit_coordinates = [b_point]
+                weakest_unit_damage = exact_damage
+            elif exact_damage == weakest_unit_damage:
+                weakest_unit_coordinates.append(b_point)
+
+            if damage == 0:
+                survivors.add(b_point)
+
+        if len(survivors) == len(sorted_belligerents):
+            survivors.difference_update(weakest_unit_coordinates)
+
+        for b_point in sorted_belligerents:
+            if b_point not in survivors:
+                self.units_killed_by_team[TEAMS[self.unit_team[b_point]]] += 1
+
+        return survivors
+
+    def get_number_of_units_by_team(self, team: Team) -> int:
+        return int(np.count_nonzero(self.unit_team == TEAM_CODES[team]))
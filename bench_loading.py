@@ -0,0 +1,105 @@
+"""
+Benchmark for loading levels.
+
+Times Board.from_serialized against the loader it replaced, which parsed every field of every tile, on the shipped
+level files, and checks both build the same boards. JSON parsing is left out of the timings, since both loaders share it.
+
+    python bench_loading.py [--repeat N] [files...]
+"""
+import argparse
+import json
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+from board import Board
+from unit import Tile, TileType, Unit, Direction
+
+Serialized = List[List[Dict]]
+
+
+def legacy_tile_type_from_str(name: str) -> TileType:
+    "TileType.from_str from before the lookup table, kept verbatim as the reference"
+    for tile_type in TileType:
+        if tile_type.value.char_code == name:
+            return tile_type
+    match name:
+        case "W":
+            return TileType.WATER
+        case "T":
+            return TileType.TRAMPOLINE
+        case "L":
+            return TileType.WALL
+        case "D":
+            return TileType.DEADWALL
+        case "R":
+            return TileType.TRAPDOOR
+        case "F":
+            return TileType.FINISH_LINE
+        case "N":
+            return TileType.TUNNEL
+        case _:
+            return TileType.GRASS
+
+
+def legacy_tile_from_serialized(serialized_data: Dict) -> Tile:
+    unit_from_serial = None
+    if serialized_data["Unit Data"] is not None:
+        unit_from_serial = Unit.from_serialized(serialized_data["Unit Data"])
+    return Tile(legacy_tile_type_from_str(serialized_data["Tile Type"]), unit_from_serial,
+                serialized_data["Player Placeable"], serialized_data["Wall Health"],
+                Direction(serialized_data["Rotation"]), serialized_data["Teleport Destination"])
+
+
+def legacy_board_from_serialized(serialized_data: Serialized) -> Board:
+    tiles = []
+    for serial_row in serialized_data:
+        tile_row = []
+        for serial_tile in serial_row:
+            tile_row.append(legacy_tile_from_serialized(serial_tile))
+        tiles.append(tile_row)
+    return Board(tiles)
+
+
+def time_loaders(loaders: List[Callable[[Serialized], Board]], boards: List[Serialized], repeat: int) -> \
+        List[Tuple[float, List[Board]]]:
+    """
+    Best of repeat runs of each loader, in seconds. The loaders take turns run by run, so a slow patch on the machine
+    hits both rather than skewing the ratio between them.
+    """
+    best: List[Optional[float]] = [None] * len(loaders)
+    loaded: List[List[Board]] = [[] for _ in loaders]
+    for _ in range(repeat):
+        for loader_idx, load in enumerate(loaders):
+            start = time.perf_counter()
+            loaded[loader_idx] = [load(serial_board) for serial_board in boards]
+            elapsed = time.perf_counter() - start
+            if best[loader_idx] is None or elapsed < best[loader_idx]:
+                best[loader_idx] = elapsed
+    return list(zip(best, loaded))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time loading boards with the prototype loader and the old one")
+    parser.add_argument("files", nargs="*", default=["new_levels.json", "levels_converted.json"])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    for filename in args.files:
+        with open(filename, "r") as json_file:
+            boards = [level["Board"] for level in json.load(json_file).values()]
+        tile_count = sum(len(row) for board in boards for row in board)
+
+        (legacy_seconds, legacy_boards), (seconds, new_boards) = time_loaders(
+            [legacy_board_from_serialized, Board.from_serialized], boards, args.repeat)
+        for legacy_board, new_board in zip(legacy_boards, new_boards):
+            if legacy_board.tiles != new_board.tiles:
+                raise SystemExit(f"{filename}: the loaders built different boards")
+
+        print(f"{filename}: {len(boards)} levels, {tile_count} tiles")
+        print(f"  old loader   {legacy_seconds * 1000:8.2f} ms  {legacy_seconds / tile_count * 1e9:7.0f} ns per tile")
+        print(f"  prototypes   {seconds * 1000:8.2f} ms  {seconds / tile_count * 1e9:7.0f} ns per tile")
+        print(f"  {legacy_seconds / seconds:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""
+Frame-time benchmark for drawing, with no window.
+
+Runs under SDL's dummy video driver and draws each game mode's screen through a scripted run of frames, the way the
+game loop draws them: the title screen, a level's dialogue typing out, placing troops, editing the level, an attempt
+playing out with its animations, and the results. Every frame is drawn in full, without the game's dirty rects. Board
+updates, dialogue clicks and the like happen between frames and aren't timed.
+
+For each screen it reports the median and 99th percentile frame time, the same for render_board, Animation.draw,
+Dialogue.render, EditScreen.common_draw and render_checkerboard_background within a frame, and the surfaces made per
+frame. Surfaces are counted where they're made: pygame.Surface, copies and subsurfaces of those, the transform
+functions and Font.render. Copies of the loaded images aren't seen, since those surfaces were made before counting
+started.
+
+Median frame times and surfaces per frame are compared against the baseline in the results file, like
+bench_simulation.py, so record one before making a change.
+
+    python bench_render.py --save                 # Record a baseline
+    python bench_render.py [--frames N] [--level N] [--only MODE]
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import functools
+import json
+import platform
+import random
+import sys
+import time
+from collections import defaultdict
+from copy import deepcopy
+from typing import Callable, Dict, List, NamedTuple, Optional
+
+import pygame
+
+import constants
+from bench_simulation import format_seconds
+from board import Board
+from gamemode import GameMode
+from gamestate import GameState
+from level import Level
+from savedata import load_levels
+from unit import Direction, Team, Unit, UnitType
+
+RESULTS_FILE = "bench_render.json"
+FRAMES_PER_UPDATE = 15  # Frames between board updates at normal speed
+
+
+class FrameProbe:
+    "What the functions being measured took, and how many surfaces were made, during the current frame"
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.surfaces = 0
+
+    def reset(self):
+        self.seconds.clear()
+        self.surfaces = 0
+
+
+probe = FrameProbe()
+
+
+def patch_everywhere(original, replacement):
+    "Swaps a function or class for replacement in every module that has it, including ones that imported it by name"
+    for module in list(sys.modules.values()):
+        for name, value in list(getattr(module, "__dict__", {}).items()):
+            if value is original:
+                setattr(module, name, replacement)
+
+
+def timed(name: str, function: Callable) -> Callable:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            probe.seconds[name] += time.perf_counter() - start
+    return wrapper
+
+
+def counted(function: Callable) -> Callable:
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        probe.surfaces += 1
+        return function(*args, **kwargs)
+    return wrapper
+
+
+class CountedSurface(pygame.Surface):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        probe.surfaces += 1
+
+    copy = counted(pygame.Surface.copy)
+    subsurface = counted(pygame.Surface.subsurface)
+    convert = counted(pygame.Surface.convert)
+    convert_alpha = counted(pygame.Surface.convert_alpha)
+
+
+class CountedFont(pygame.font.Font):
+    render = counted(pygame.font.Font.render)
+
+
+def install_probes():
+    "Call once every game module is imported"
+    import animations
+    import board_renderer
+    import dialogue
+    import main
+    from mode_screens.edit_mode import EditScreen
+
+    patch_everywhere(pygame.Surface, CountedSurface)
+    pygame.surface.Surface = CountedSurface
+    for name in ["flip", "rotate", "rotozoom", "scale", "scale_by", "smoothscale", "smoothscale_by", "scale2x", "chop"]:
+        setattr(pygame.transform, name, counted(getattr(pygame.transform, name)))
+
+    patch_everywhere(board_renderer.render_board, timed("render_board", board_renderer.render_board))
+    patch_everywhere(main.render_checkerboard_background,
+                     timed("render_checkerboard_background", main.render_checkerboard_background))
+    dialogue.Dialogue.render = timed("Dialogue.render", dialogue.Dialogue.render)
+    EditScreen.common_draw = timed("EditScreen.common_draw", EditScreen.common_draw)
+
+    # Every kind of animation is timed together, since a frame draws a mix of them
+    animation_classes = [animations.Animation]
+    while animation_classes:
+        animation_class = animation_classes.pop()
+        animation_classes += animation_class.__subclasses__()
+        if "draw" in animation_class.__dict__:
+            animation_class.draw = timed("Animation.draw", animation_class.draw)
+
+
+class Scenario(NamedTuple):
+    mode: GameMode
+    draw: Callable[[int], None]  # Draws the given frame. Timed
+    step: Optional[Callable[[int], None]] = None  # What the game does after the frame is drawn. Not timed
+
+
+class FrameTimes(NamedTuple):
+    frame_seconds: List[float]
+    function_seconds: Dict[str, List[float]]  # Time spent in each measured function, over the frames that called it
+    surfaces: List[int]
+
+
+def place_troops(board: Board, rng: random.Random):
+    "Puts ORANGE soldiers on about half the free squares they can go on"
+    for row_idx, row in enumerate(board.tiles):
+        for col_idx, tile in enumerate(row):
+            if tile.is_placeable and tile.is_free() and rng.random() < 0.5:
+                tile.unit = Unit(UnitType.SOLDIER, Direction.RIGHT, Team.ORANGE)
+                board.mark_dirty(row_idx, col_idx)
+    board.update_strength_defense(0)
+
+
+def get_game_state(level: Level, game_mode: GameMode, troops: bool) -> GameState:
+    game_state = GameState(None, game_mode, 5, 0, 0, "", None, 0, 0)
+    game_state.data_from_level(deepcopy(level))
+    if troops:
+        place_troops(game_state.board, random.Random(0))
+    else:
+        game_state.board.update_strength_defense(0)
+    game_state.placed_units = game_state.board.get_number_of_units_by_team(Team.ORANGE)
+    return game_state
+
+
+def get_scenarios(screen: pygame.Surface, levels: List[Level], level_idx: int) -> List[Scenario]:
+    import main
+    from mode_screens.dialogue_mode import get_dialogue_screen
+    from mode_screens.edit_mode import get_edit_screen
+    from mode_screens.result_mode import get_results_screen
+    from title import render_title_screen
+    from ui import TextButton
+
+    edit_screen = get_edit_screen(main.play_button)
+    dialogue_screen = get_dialogue_screen()
+    results_screen = get_results_screen(constants.big_font)
+    start_button = TextButton(constants.SCREEN_WIDTH // 2 - 100, constants.SCREEN_HEIGHT // 2, 200, 50, "Start Game",
+                              constants.big_font)
+    level = levels[level_idx]
+
+    def start_frame(game_state: GameState, frame: int):
+        game_state.frame_count = frame
+        game_state.animation_frame = frame
+        main.render_checkerboard_background(screen, frame)
+
+    def draw_title(frame: int):
+        main.render_checkerboard_background(screen, frame)
+        render_title_screen(screen, constants.title_font, start_button)
+
+    # The level's dialogue, or the first one in the campaign if it has none, clicked through as each line finishes
+    dialogue_level = level if level.opening_dialogue else next((other for other in levels if other.opening_dialogue),
+                                                               level)
+    dialogue_state = get_game_state(dialogue_level, GameMode.DIALOGUE, False)
+    first_dialogue = dialogue_state.current_dialogue
+
+    def draw_dialogue(frame: int):
+        start_frame(dialogue_state, frame)
+        dialogue_screen.draw(screen, dialogue_state)
+
+    def next_dialogue(frame: int):
+        current_dialogue = dialogue_state.current_dialogue
+        if current_dialogue is not None and current_dialogue.is_complete(frame):
+            current_dialogue = current_dialogue.next or first_dialogue
+            current_dialogue.first_appear_frame = None
+            dialogue_state.current_dialogue = current_dialogue
+
+    troops_state = get_game_state(level, GameMode.EDIT_TROOPS, True)
+
+    def draw_troops(frame: int):
+        start_frame(troops_state, frame)
+        edit_screen.common_draw(screen, troops_state)
+
+    edit_state = get_game_state(level, GameMode.EDIT_LEVEL, False)
+
+    def draw_edit(frame: int):
+        start_frame(edit_state, frame)
+        edit_screen.draw(screen, edit_state)
+
+    # Plays the level out from the start, and again from the start once it ends
+    play_state = get_game_state(level, GameMode.PLAY_TROOPS, True)
+    play_start = deepcopy(play_state.board)
+    play_state.board.set_initial_animations(1)
+
+    def draw_play(frame: int):
+        start_frame(play_state, frame)
+        edit_screen.common_draw(screen, play_state)
+
+    def update_play(frame: int):
+        if frame % FRAMES_PER_UPDATE == 0 and not play_state.board.update(frame):
+            play_state.board = deepcopy(play_start)
+            play_state.board.update_strength_defense(frame)
+            play_state.board.set_initial_animations(frame)
+
+    results_state = get_game_state(level, GameMode.RESULTS_SCREEN, False)
+
+    def draw_results(frame: int):
+        start_frame(results_state, frame)
+        results_screen.draw(screen, results_state, levels, level_idx)
+
+    # TEST_LEVEL has no screen of its own; the game never enters it
+    return [
+        Scenario(GameMode.TITLE_SCREEN, draw_title),
+        Scenario(GameMode.DIALOGUE, draw_dialogue, next_dialogue),
+        Scenario(GameMode.EDIT_TROOPS, draw_troops),
+        Scenario(GameMode.EDIT_LEVEL, draw_edit),
+        Scenario(GameMode.PLAY_TROOPS, draw_play, update_play),
+        Scenario(GameMode.RESULTS_SCREEN, draw_results),
+    ]
+
+
+def run_scenario(scenario: Scenario, frames: int) -> FrameTimes:
+    times = FrameTimes([], defaultdict(list), [])
+    for frame in range(1, frames + 1):
+        pygame.event.pump()
+        probe.reset()
+        start = time.perf_counter()
+        scenario.draw(frame)
+        times.frame_seconds.append(time.perf_counter() - start)
+        times.surfaces.append(probe.surfaces)
+        for name, seconds in probe.seconds.items():
+            times.function_seconds[name].append(seconds)
+        pygame.display.flip()
+        if scenario.step is not None:
+            scenario.step(frame)
+    return times
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    "Nearest rank"
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def compare(name: str, value: float, baseline: Dict[str, float], threshold: float, regressions: List[str]) -> str:
+    if name not in baseline:
+        return ""
+    if baseline[name] == 0:
+        change = 0 if value == 0 else float("inf")
+    else:
+        change = value / baseline[name] - 1
+    line = f"  {change:+7.1%}"
+    if change > threshold:
+        regressions.append(name)
+        line += "  REGRESSION"
+    return line
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time drawing each game screen under SDL's dummy video driver")
+    parser.add_argument("--frames", type=int, default=300, help="Frames drawn of each screen")
+    parser.add_argument("--levels", default="new_levels.json")
+    parser.add_argument("--level", type=int, default=None, help="Level to draw, from 1. Defaults to the largest")
+    parser.add_argument("--only", default=None, help="Only draw screens whose mode contains this, like EDIT")
+    parser.add_argument("--results", default=RESULTS_FILE, help="Where the baseline is kept")
+    parser.add_argument("--save", action="store_true", help="Record these results as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Slowdown past the baseline that's flagged")
+    args = parser.parse_args()
+
+    pygame.init()
+    import main as game  # Opens the display at its size, the way the game starts up
+    screen = game.screen
+    constants.big_font = CountedFont("resources/fonts/CDSbodyV2.ttf", 8 * 6)
+    constants.small_font = CountedFont("resources/fonts/CDSbodyV2.ttf", 8 * 4)
+    constants.title_font = CountedFont("resources/fonts/CDStitleUnicaseV.ttf", 8 * 8)
+
+    levels = load_levels(args.levels)
+    if args.level is None:
+        level_idx = max(range(len(levels)), key=lambda idx: sum(len(row) for row in levels[idx].board.tiles))
+    else:
+        level_idx = args.level - 1
+    scenarios = get_scenarios(screen, levels, level_idx)
+    install_probes()
+
+    baseline = {}
+    if os.path.exists(args.results):
+        with open(args.results, "r") as results_file:
+            baseline = json.load(results_file)["Results"]
+
+    board = levels[level_idx].board
+    print(f"Level {level_idx + 1}, {len(board.tiles)}x{len(board.tiles[0])}, {args.frames} frames of each screen")
+    results = {}
+    regressions = []
+    for scenario in scenarios:
+        if args.only is not None and args.only.upper() not in scenario.mode.name:
+            continue
+        times = run_scenario(scenario, args.frames)
+        key = f"level{level_idx + 1}/{scenario.mode.name}"  # Baselines are kept per level
+        p50 = results[f"{key} p50"] = percentile(times.frame_seconds, 0.5)
+        results[f"{key} p99"] = percentile(times.frame_seconds, 0.99)
+        surfaces = results[f"{key} surfaces"] = sum(times.surfaces) / len(times.surfaces)
+        print(f"{scenario.mode.name:32} p50 {format_seconds(p50)}  p99 {format_seconds(results[f'{key} p99'])}"
+              f"{compare(f'{key} p50', p50, baseline, args.threshold, regressions)}")
+        print(f"  {'surfaces per frame':30} {surfaces:7.2f}       max {max(times.surfaces):4}"
+              f"{compare(f'{key} surfaces', surfaces, baseline, args.threshold, regressions)}")
+        for name, function_seconds in sorted(times.function_seconds.items()):
+            p50 = results[f"{key}/{name} p50"] = percentile(function_seconds, 0.5)
+            results[f"{key}/{name} p99"] = percentile(function_seconds, 0.99)
+            print(f"  {name:30} p50 {format_seconds(p50)}  p99 {format_seconds(results[f'{key}/{name} p99'])}"
+                  f"{compare(f'{key}/{name} p50', p50, baseline, args.threshold, regressions)}")
+
+    if args.save:
+        saved = {"Machine": platform.platform(), "Python": platform.python_version(), "Pygame": pygame.version.ver,
+                 "Recorded": time.strftime("%Y-%m-%d %H:%M:%S"), "Results": {**baseline, **results}}
+        with open(args.results, "w") as results_file:
+            json.dump(saved, results_file, indent=1)
+        print(f"Saved {len(results)} results to {args.results}")
+
+    pygame.quit()
+    if regressions:
+        print(f"{len(regressions)} results worse than the baseline")
+    raise SystemExit(1 if regressions and not args.save else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""
+Micro-benchmarks for the simulation's hot paths.
+
+Times Board.update, identify_chains, resolve_conflict, update_strength_defense and deepcopy on every shipped level and
+on random 64x64 and 256x256 boards, dense and sparse, and times loading and saving level files. Each result is the
+best per-call time over several rounds, which is the least disturbed by whatever else the machine is doing.
+
+Results are compared against the baseline in the results file, and any benchmark slower than its baseline by more than
+the threshold is flagged, with a non-zero exit. Baselines depend on the machine, so record one before making a change.
+
+    python bench_simulation.py --save              # Record a baseline
+    python bench_simulation.py [--threshold 0.25]  # Compare against it
+    python bench_simulation.py --only 64x64 --quick
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+from copy import deepcopy
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from board import Board
+from check_conflicts import indexed_find_conflicts, random_board
+from savedata import load_levels, save_levels
+
+RESULTS_FILE = "bench_simulation.json"
+ROUND_SECONDS = 0.05  # Calls are batched into rounds of about this long
+MAX_COPIES = 200  # Most fresh boards prepared for one round of a benchmark that changes its board
+
+
+class BenchCase(NamedTuple):
+    name: str
+    run: Callable  # Takes the prepared argument and does one call of the code being timed
+    prepare: Optional[Callable] = None  # Makes a fresh argument for each call, outside the timing. None reuses one
+    argument: object = None
+
+
+def fresh_copy(board: Board) -> Callable[[], Board]:
+    "Copies come back with default defenses, so they're recounted the way the game does before play"
+    def prepare() -> Board:
+        board_copy = deepcopy(board)
+        board_copy.update_strength_defense(0)
+        return board_copy
+    return prepare
+
+
+def recount_strength_defense(board: Board):
+    board.mark_all_dirty()
+    board.update_strength_defense(0)
+
+
+def resolve_conflicts(arguments: Tuple[Board, list]):
+    board, conflicts = arguments
+    for conflict in conflicts:
+        board.resolve_conflict(conflict)
+
+
+def get_boards(quick: bool) -> Dict[str, Board]:
+    boards = {}
+    for level_idx, level in enumerate(load_levels("new_levels.json")):
+        boards[f"level{level_idx + 1}"] = level.board
+
+    rng = random.Random(0)
+    sizes = [64] if quick else [64, 256]
+    for size in sizes:
+        for fill, density in [("dense", 0.5), ("sparse", 0.05)]:
+            boards[f"{size}x{size} {fill}"] = random_board(rng, size, size, density)
+
+    for board in boards.values():
+        board.update_strength_defense(0)
+    return boards
+
+
+def get_cases(boards: Dict[str, Board], temp_folder: str) -> List[BenchCase]:
+    cases = []
+    for board_name, board in boards.items():
+        conflicts = list(indexed_find_conflicts(board)[0].values())
+        cases += [
+            BenchCase(f"update/{board_name}", lambda board_copy: board_copy.update(0), fresh_copy(board)),
+            BenchCase(f"identify_chains/{board_name}", Board.identify_chains, fresh_copy(board)),
+            BenchCase(f"update_strength_defense/{board_name}", recount_strength_defense, argument=deepcopy(board)),
+            BenchCase(f"deepcopy/{board_name}", deepcopy, argument=board),
+        ]
+        if conflicts:
+            cases.append(BenchCase(f"resolve_conflict/{board_name}", resolve_conflicts,
+                                   argument=(deepcopy(board), conflicts)))
+
+    # The shipped campaign, and a campaign of the largest random board
+    campaigns = {"campaign": load_levels("new_levels.json")}
+    largest = max(boards, key=lambda name: len(boards[name].tiles))
+    campaigns[largest] = [deepcopy(campaigns["campaign"][0])]
+    campaigns[largest][0].board = boards[largest]
+    for campaign_name, levels in campaigns.items():
+        filename = os.path.join(temp_folder, f"{campaign_name.replace(' ', '_')}.json")
+        save_levels(filename, levels)
+        cases += [
+            BenchCase(f"load_levels/{campaign_name}", load_levels, argument=filename),
+            BenchCase(f"save_levels/{campaign_name}", lambda levels, out=filename + ".out": save_levels(out, levels),
+                      argument=levels),
+        ]
+    return cases
+
+
+def time_case(case: BenchCase, rounds: int) -> float:
+    "Best seconds per call over the rounds"
+    def time_round(number: int) -> float:
+        if case.prepare is None:
+            arguments = [case.argument] * number
+        else:
+            arguments = [case.prepare() for _ in range(number)]
+        start = time.perf_counter()
+        for argument in arguments:
+            case.run(argument)
+        return (time.perf_counter() - start) / number
+
+    # One call to warm up and size the rounds
+    per_call = time_round(1)
+    number = max(1, int(ROUND_SECONDS / max(per_call, 1e-9)))
+    if case.prepare is not None:
+        number = min(number, MAX_COPIES)
+    return min([per_call] + [time_round(number) for _ in range(rounds)])
+
+
+def format_seconds(seconds: float) -> str:
+    for unit, scale in [("s", 1), ("ms", 1e-3), ("us", 1e-6)]:
+        if seconds >= scale:
+            return f"{seconds / scale:7.2f} {unit}"
+    return f"{seconds / 1e-9:7.0f} ns"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the simulation's hot paths and compare against a baseline")
+    parser.add_argument("--results", default=RESULTS_FILE, help="Where the baseline is kept")
+    parser.add_argument("--save", action="store_true", help="Record these timings as the baseline")
+    parser.add_argument("--threshold", type=float, default=0.25, help="Slowdown past the baseline that's flagged")
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--only", default=None, help="Only run benchmarks whose name contains this")
+    parser.add_argument("--quick", action="store_true", help="Skip the 256x256 boards")
+    args = parser.parse_args()
+
+    baseline = {}
+    if os.path.exists(args.results):
+        with open(args.results, "r") as results_file:
+            baseline = json.load(results_file)["Timings"]
+
+    timings = {}
+    regressions = []
+    with tempfile.TemporaryDirectory() as temp_folder:
+        for case in get_cases(get_boards(args.quick), temp_folder):
+            if args.only is not None and args.only not in case.name:
+                continue
+            seconds = timings[case.name] = time_case(case, args.rounds)
+            line = f"{case.name:45} {format_seconds(seconds)}"
+            if case.name in baseline:
+                change = seconds / baseline[case.name] - 1
+                line += f"  {change:+7.1%} vs {format_seconds(baseline[case.name]).strip()}"
+                if change > args.threshold:
+                    regressions.append(case.name)
+                    line += "  REGRESSION"
+            print(line, flush=True)
+
+    if args.save:
+        results = {"Machine": platform.platform(), "Python": platform.python_version(),
+                   "Recorded": time.strftime("%Y-%m-%d %H:%M:%S"), "Timings": {**baseline, **timings}}
+        with open(args.results, "w") as results_file:
+            json.dump(results, results_file, indent=1)
+        print(f"Saved {len(timings)} timings to {args.results}")
+
+    if regressions:
+        print(f"{len(regressions)} benchmarks slower than the baseline by more than {args.threshold:.0%}")
+    raise SystemExit(1 if regressions and not args.save else 0)
+
+
+if __name__ == "__main__":
+    main()
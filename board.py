@@ -1,17 +1,22 @@
 from copy import deepcopy
-from typing import NamedTuple, List, Optional, Self, Tuple, Set, Dict
+from typing import List, Optional, Self, Tuple, Set, Dict, Callable, TYPE_CHECKING
 
-import pygame
-from pygame import Surface
-
-from animations import Animation, UnitMovementAnimation, StaticUnitAnimation, UnitDeathAnimation, UnitWinAnimation, \
-    FlankAnimation
+from chains import resolve_chains
+from conflicts import Conflict, Claim, find_conflicts
 from constants import SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE
-from gamemode import GameMode
+from events import SimulationEvent, UnitMoved, UnitHeld, UnitKilled, UnitExited, FlankFormed, FlanksCleared
 from unit import Tile, Team, TileType, Unit, UnitType, Direction
+from zobrist import board_hash, unit_key, terrain_key
+
+if TYPE_CHECKING:
+    from animations import Animation
 
 
 class Board:
+    # Renderers subscribe here to turn simulation events into animations. Headless runs leave it empty, so a tick
+    # never builds event objects nobody will draw.
+    event_subscribers: List[Callable[["Board", int, SimulationEvent], None]] = []
+
     def __init__(self, tiles: List[List[Tile]]):
         self.tiles = tiles
         self.finished_units_by_team = {
@@ -22,60 +27,47 @@ class Board:
             team: 0
             for team in Team
         }
-        self.animations: List[Animation] = []
+        self.animations: List["Animation"] = []
         self.updates = 0
 
+        # Strength and defense only change along the rows and columns where units were placed or removed, so only
+        # those are recounted. flank_runs keeps each column's runs of two or more same-team units.
+        self.flank_runs: Dict[int, List[Tuple[int, int]]] = {}
+        self.flank_animations: Dict[int, List["Animation"]] = {}
+        self.dirty_rows: Set[int] = set()
+        self.dirty_cols: Set[int] = set()
+        self.mark_all_dirty()
+        # Squares whose terrain changed since the renderer last redrew them
+        self.dirty_terrain: Set[Tuple[int, int]] = set()
+
+        # Zobrist hash of the units and terrain, kept up to date through updates. Edits drop it to None and it's
+        # recomputed on the next update, which also forgets the states seen before the edit.
+        self.state_hash: Optional[int] = None
+        self.seen_states: Set[int] = set()
+        self.repeated_state = False  # Whether the last update ended the game by returning to an earlier state
+
     @classmethod
     def from_serialized(cls, serialized_data: List[List[Dict[str, Optional[Dict[str, int | str]] | bool | int | str | Tuple[int]]]]) -> Self:
-        tiles = []
-        for serial_row in serialized_data:
-            tile_row = []
-            for serial_tile in serial_row:
-                tile_row.append(Tile.from_serialized(serial_tile))
-            tiles.append(tile_row)
+        tile_from_serialized = Tile.from_serialized
+        return Board([[tile_from_serialized(serial_tile) for serial_tile in serial_row] for serial_row in serialized_data])
 
-        return Board(tiles)
 
+    def emit(self, frame: int, event: SimulationEvent):
+        for subscriber in self.event_subscribers:
+            subscriber(self, frame, event)
 
     def set_initial_animations(self, frame: int):
         self.animations = []
 
-        for row_idx, row in enumerate(self.tiles):
-            for col_idx, tile in enumerate(row):
-                if tile.unit is not None:
-                    self.animations.append(
-                        StaticUnitAnimation(frame, tile.unit, self.col_to_x(col_idx), self.row_to_y(row_idx))
-                    )
-
-    def render(self, screen: Surface, game_state: GameMode, frame: int, dark=False):
-        # Calculate the offsets to center the board on the screen
-        offset_x = (SCREEN_WIDTH - len(self.tiles[0]) * TILE_SIZE) // 2
-        offset_y = (SCREEN_HEIGHT - len(self.tiles) * TILE_SIZE) // 2
-
-        rect = pygame.Rect(offset_x - 8, offset_y - 8, TILE_SIZE * len(self.tiles[0]) + 16, TILE_SIZE* len(self.tiles) + 16)
-        pygame.draw.rect(screen, (0,0,0), rect, width=8)
-
-        for row_idx, row in enumerate(self.tiles):
-            for col_idx, tile in enumerate(row):
-                # Calculate the screen position of the tile
-                tile_x = offset_x + col_idx * TILE_SIZE
-                tile_y = offset_y + row_idx * TILE_SIZE
-
-                # Render the tile image
-                tile.render(screen, tile_x, tile_y)
-
-                # Render the unit if present (AND it's edit mode cuz if so, no animations)
-                # len(animations) == 0 is a total hack, to patch the first frame of play mode where animations haven't been populated yet
-                if tile.unit is not None and (game_state != GameMode.PLAY_TROOPS or len(self.animations) == 0):
-                    screen.blit(tile.unit.get_image(), (tile_x, tile_y))
-
-                # Darken tile if it is not passable or not placeable
-                if (dark or game_state == GameMode.EDIT_TROOPS) and (not tile.type.value.is_passable or not tile.is_placeable):
-                    dark_surface = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
-                    dark_surface.fill((0, 0, 0, 100))  # Semi-transparent black overlay
-                    screen.blit(dark_surface, (tile_x, tile_y))
-        for animation in self.animations:
-            animation.draw(screen, frame, game_state)
+        if self.event_subscribers:
+            # Flanks stay hidden until the first tick recounts them
+            for col_idx in self.flank_runs:
+                self.emit(frame, FlanksCleared(col_idx))
+            self.dirty_cols.update(self.flank_runs)
+            for row_idx, row in enumerate(self.tiles):
+                for col_idx, tile in enumerate(row):
+                    if tile.unit is not None:
+                        self.emit(frame, UnitHeld(tile.unit, row_idx, col_idx))
 
     def row_to_y(self, row_idx: int):
         offset_y = (SCREEN_HEIGHT - len(self.tiles) * TILE_SIZE) // 2
@@ -86,11 +78,21 @@ class Board:
 
         return col_idx * TILE_SIZE + offset_x
 
+    def get_state_hash(self) -> int:
+        if self.state_hash is None:
+            self.state_hash = board_hash(self.tiles)
+            self.seen_states = {self.state_hash}
+        return self.state_hash
+
     def update(self, frame: int) -> bool:
-        "Returns whether the board changed during update"
+        """
+        Returns whether the board reached a state it hasn't been in before. That's False when nothing changed, and
+        also when the board has started cycling through the same states, which would otherwise go on forever.
+        """
 
         self.animations = []
         self.updates += 1
+        previous_hash = self.get_state_hash()
 
         # Start by populating new_tiles with the base tiles (not units) from the current board
         new_tiles = [
@@ -105,116 +107,190 @@ class Board:
         # Then, place units in their new positions, detecting collisions where they exist
 
         chains, locked_units, victims = self.identify_chains()
+        emitting = bool(self.event_subscribers)
+
+        # The hash follows every unit and wall as it changes, rather than comparing the old and new boards
+        state_hash = previous_hash
+        for unit, row_idx, col_idx in victims:
+            # A unit fighting in two conflicts at once is listed again with no unit once the first has removed it
+            if unit is not None:
+                state_hash ^= unit_key(row_idx, col_idx, unit)
 
+        moved = set()
         for chain in chains:
             for row_idx, col_idx in chain:
+                _, f_row_idx, f_col_idx = self.get_faced_tile(row_idx, col_idx)
+                # A unit can turn up in two chains, and a move can land on a unit that has already moved in
+                if (row_idx, col_idx) not in moved:
+                    moved.add((row_idx, col_idx))
+                    state_hash ^= unit_key(row_idx, col_idx, self.tiles[row_idx][col_idx].unit)
+                overwritten = new_tiles[f_row_idx][f_col_idx].unit
+                if overwritten is not None:
+                    state_hash ^= unit_key(f_row_idx, f_col_idx, overwritten)
                 self.move_unit(new_tiles, row_idx, col_idx)
-                if self.get_faced_tile(row_idx, col_idx)[0].type != TileType.TRAPDOOR:
-                    if new_tiles[row_idx][col_idx].type != TileType.TRAMPOLINE:
-                        self.animations.append(UnitMovementAnimation(frame, self.tiles[row_idx][col_idx].unit, self.col_to_x(col_idx), self.row_to_y(row_idx)))
-                    else:
-                        self.animations.append(UnitMovementAnimation(frame, self.tiles[row_idx][col_idx].unit, self.col_to_x(col_idx), self.row_to_y(row_idx), self.tiles[row_idx][col_idx].unit.direction))
+                state_hash ^= unit_key(f_row_idx, f_col_idx, new_tiles[f_row_idx][f_col_idx].unit)
+                if emitting and self.get_faced_tile(row_idx, col_idx)[0].type != TileType.TRAPDOOR:
+                    unit = self.tiles[row_idx][col_idx].unit
+                    self.emit(frame, UnitMoved(unit, row_idx, col_idx, unit.direction))
         for row_idx, col_idx in locked_units:
             if self.tiles[row_idx][col_idx].type != TileType.FINISH_LINE:
+                if new_tiles[row_idx][col_idx].unit is not None:
+                    state_hash ^= unit_key(row_idx, col_idx, new_tiles[row_idx][col_idx].unit)
                 new_tiles[row_idx][col_idx].unit = self.tiles[row_idx][col_idx].unit
-                if self.tiles[row_idx][col_idx].type != TileType.TRAPDOOR:
-                    self.animations.append(StaticUnitAnimation(frame, self.tiles[row_idx][col_idx].unit, self.col_to_x(col_idx), self.row_to_y(row_idx)))
+                if emitting and self.tiles[row_idx][col_idx].type != TileType.TRAPDOOR:
+                    self.emit(frame, UnitHeld(self.tiles[row_idx][col_idx].unit, row_idx, col_idx))
             else:
                 unit = self.tiles[row_idx][col_idx].unit
                 self.finished_units_by_team[unit.team] += 1
-                # Unit Win!! animation goes here
-                self.animations.append(UnitWinAnimation(frame, self.tiles[row_idx][col_idx].unit, self.col_to_x(col_idx), self.row_to_y(row_idx)))
+                state_hash ^= unit_key(row_idx, col_idx, unit)
+                if emitting:
+                    self.emit(frame, UnitExited(unit, row_idx, col_idx))
 
-        for unit, row_idx, col_idx in victims:
-            self.animations.append(UnitDeathAnimation(frame, unit, self.col_to_x(col_idx), self.row_to_y(row_idx)))
+        if emitting:
+            for unit, row_idx, col_idx in victims:
+                self.emit(frame, UnitKilled(unit, row_idx, col_idx))
 
         # logic for all relevant items
         for row_idx, row in enumerate(new_tiles):
             for col_idx, tile in enumerate(row):
                 if tile.unit is not None:
+                    # Each branch hashes the unit back in wherever it ends up, facing wherever it ends up facing
+                    state_hash ^= unit_key(row_idx, col_idx, tile.unit)
                     # Trampolines
                     tile.trampoline_bounce()
                     # Lava
                     if self.tiles[row_idx][col_idx].type == TileType.TRAPDOOR:
-                        self.animations.append(UnitDeathAnimation(frame, tile.unit, self.col_to_x(col_idx), self.row_to_y(row_idx)))
+                        if emitting:
+                            self.emit(frame, UnitKilled(tile.unit, row_idx, col_idx))
                         self.units_killed_by_team[new_tiles[row_idx][col_idx].unit.team] += 1
                         new_tiles[row_idx][col_idx].unit = None
                     #Teleporter
                     elif self.tiles[row_idx][col_idx].type == TileType.TUNNEL:
                         dest = self.tiles[row_idx][col_idx].destination
-                        print(str(dest[0])  + ' ' + str(dest[1]))
+                        displaced_unit = new_tiles[dest[0]][dest[1]].unit
+                        if displaced_unit is not None:
+                            state_hash ^= unit_key(dest[0], dest[1], displaced_unit)
+                        state_hash ^= unit_key(dest[0], dest[1], tile.unit)
                         new_tiles[dest[0]][dest[1]].unit = tile.unit
-                        self.animations.append(UnitWinAnimation(frame, tile.unit, self.col_to_x(col_idx), self.row_to_y(row_idx)))
+                        if emitting:
+                            self.emit(frame, UnitExited(tile.unit, row_idx, col_idx))
                         tile.unit = None
                     else:
+                        state_hash ^= unit_key(row_idx, col_idx, tile.unit)
                         #Walls
                         faced_tile, faced_row, faced_col = self.get_new_faced_tile(new_tiles, row_idx, col_idx)
                         if faced_tile is not None and faced_tile.type == TileType.WALL:
+                            state_hash ^= terrain_key(faced_row, faced_col, faced_tile)
                             if faced_tile.health > tile.unit.type.value:
                                 faced_tile.health -= tile.unit.type.value
                             else:
+                                if faced_tile.unit is not None:
+                                    # Only a tunnel can drop a unit onto a wall, and the unit goes down with it
+                                    state_hash ^= unit_key(faced_row, faced_col, faced_tile.unit)
                                 new_tiles[faced_row][faced_col] = Tile(TileType.DEADWALL, None, faced_tile.is_placeable)
-        change = self.tiles != new_tiles
+                                self.mark_terrain_dirty(faced_row, faced_col)
+                            state_hash ^= terrain_key(faced_row, faced_col, new_tiles[faced_row][faced_col])
         self.tiles = new_tiles
+        self.mark_all_dirty()
+
+        change = state_hash not in self.seen_states
+        self.repeated_state = not change and state_hash != previous_hash
+        self.seen_states.add(state_hash)
+        self.state_hash = state_hash
 
         # Now, we update each troop's strength
         self.update_strength_defense(frame)
         return change
 
+    def mark_dirty(self, row_idx: int, col_idx: int):
+        "Records that the unit on a square was placed or removed, so its row and column get recounted"
+        self.dirty_rows.add(row_idx)
+        self.dirty_cols.add(col_idx)
+        self.state_hash = None
+
+    def mark_terrain_dirty(self, row_idx: int, col_idx: int):
+        self.dirty_terrain.add((row_idx, col_idx))
+        self.state_hash = None
+
+    def mark_all_dirty(self):
+        self.dirty_rows = set(range(len(self.tiles)))
+        self.dirty_cols = set(range(len(self.tiles[0])))
+        self.state_hash = None
+
     def update_strength_defense(self, frame: int):
-        for row_idx, row in enumerate(self.tiles):
-            unit_line = []
-            for col_idx, tile in enumerate(row):
-                if tile.unit is not None and (len(unit_line) == 0 or tile.unit.team == unit_line[0].team):
-                    unit_line.append(tile.unit)
-                else:
-                    for unit in unit_line:
-                        unit.type = UnitType(min(4, len(unit_line)))
-                    if tile.unit is None:
-                        unit_line = []
-                    else:
-                        unit_line = [tile.unit]
-            for unit in unit_line:
-                unit.type = UnitType(min(4, len(unit_line)))
+        "Recounts strength for the dirty rows and defense and flanks for the dirty columns"
+        for row_idx in sorted(self.dirty_rows):
+            self.update_row_strength(row_idx)
 
         # ... And we update each troop's defense
 
-        for col_idx in range(len(self.tiles[0])):
-            unit_line = []
-            start_row_idx = 0
-            for row_idx in range(len(self.tiles)):
-                tile = self.tiles[row_idx][col_idx]
-
-                if tile.unit is not None and len(unit_line) == 0:
-                    unit_line.append(tile.unit)
+        for col_idx in [col_idx for col_idx in self.flank_runs if col_idx >= len(self.tiles[0])]:
+            self.flank_runs.pop(col_idx)
+            if self.event_subscribers:
+                self.emit(frame, FlanksCleared(col_idx))
+        for col_idx in sorted(self.dirty_cols):
+            self.update_column_defense(frame, col_idx)
+
+        self.dirty_rows = set()
+        self.dirty_cols = set()
+
+    def update_row_strength(self, row_idx: int):
+        unit_line = []
+        for tile in self.tiles[row_idx]:
+            if tile.unit is not None and (len(unit_line) == 0 or tile.unit.team == unit_line[0].team):
+                unit_line.append(tile.unit)
+            else:
+                for unit in unit_line:
+                    unit.type = UnitType(min(4, len(unit_line)))
+                if tile.unit is None:
+                    unit_line = []
+                else:
+                    unit_line = [tile.unit]
+        for unit in unit_line:
+            unit.type = UnitType(min(4, len(unit_line)))
+
+    def update_column_defense(self, frame: int, col_idx: int):
+        flank_runs = []
+        unit_line = []
+        start_row_idx = 0
+        for row_idx in range(len(self.tiles)):
+            tile = self.tiles[row_idx][col_idx]
+
+            if tile.unit is not None and len(unit_line) == 0:
+                unit_line.append(tile.unit)
+                start_row_idx = row_idx
+            elif tile.unit is not None and tile.unit.team == unit_line[0].team:
+                unit_line.append(tile.unit)
+            else:
+                for unit in unit_line:
+                    unit.defense = min(5, len(unit_line))
+                if tile.unit is not None:
                     start_row_idx = row_idx
-                elif tile.unit is not None and tile.unit.team == unit_line[0].team:
-                    unit_line.append(tile.unit)
+                    if len(unit_line) > 1:
+                        flank_runs.append((start_row_idx, row_idx - 1))
+                    unit_line = [tile.unit]
                 else:
-                    for unit in unit_line:
-                        unit.defense = min(5, len(unit_line))
-                    if tile.unit is not None:
-                        start_row_idx = row_idx
-                        if len(unit_line) > 1:
-                            self.animations.append(
-                                FlankAnimation(frame, self.row_to_y(start_row_idx), self.row_to_y(row_idx - 1),
-                                               self.col_to_x(col_idx)))
-                        unit_line = [tile.unit]
-                    else:
-                        if len(unit_line) > 1:
-                            self.animations.append(FlankAnimation(frame,  self.row_to_y(start_row_idx), self.row_to_y(row_idx),
-                                                                  self.col_to_x(col_idx)))
-                        unit_line = []
-
-            for unit in unit_line:
-                unit.defense = min(5, len(unit_line))
-            if len(unit_line) > 1:
-                self.animations.append(FlankAnimation(frame, self.row_to_y(start_row_idx), self.row_to_y(len(self.tiles)), self.col_to_x(col_idx)))
-
-    def resolve_conflict(self, conflict: "Conflict") -> Set[Tuple[int, int]]:
+                    if len(unit_line) > 1:
+                        flank_runs.append((start_row_idx, row_idx))
+                    unit_line = []
+
+        for unit in unit_line:
+            unit.defense = min(5, len(unit_line))
+        if len(unit_line) > 1:
+            flank_runs.append((start_row_idx, len(self.tiles)))
+
+        had_flanks = self.flank_runs.pop(col_idx, None) is not None
+        if flank_runs:
+            self.flank_runs[col_idx] = flank_runs
+        if self.event_subscribers:
+            if had_flanks:
+                self.emit(frame, FlanksCleared(col_idx))
+            for start_row_idx, end_row_idx in flank_runs:
+                self.emit(frame, FlankFormed(col_idx, start_row_idx, end_row_idx))
+
+    def resolve_conflict(self, conflict: Conflict) -> Set[Tuple[int, int]]:
         team_damage = {team: 0 for team in Team}
         belligerent_coordinates = [c for c in conflict.belligerent_coordinates if self.tiles[c[0]][c[1]].unit is not None]
-        print([c for c in conflict.belligerent_coordinates if self.tiles[c[0]][c[1]].unit is None])
         sorted_belligerents = sorted(
             belligerent_coordinates,
             key=lambda coordinate: self.tiles[coordinate[0]][coordinate[1]].unit.defense,
@@ -271,9 +347,6 @@ class Board:
         _, f_row_idx, f_col_idx = self.get_faced_tile(row_idx, col_idx)
         new_tiles[f_row_idx][f_col_idx].unit = self.tiles[row_idx][col_idx].unit
 
-    class Conflict(NamedTuple):
-        belligerent_coordinates: Set[Tuple[int, int]]
-
     def identify_chains(self) -> Tuple[List[List[Tuple[int, int]]], Set[Tuple[int, int]], List[Tuple[Unit, int, int]]]:
         """
         Returns a tuple with two elements.
@@ -282,79 +355,20 @@ class Board:
         The third is a list of units that are dying this turn
         Every unit is in a chain or it cannot move.
         """
-        chains_starting_points = {}
-        identified_unit_points = set()
-        locked_unit_points = set()
         victims = []
 
-        stuck_unit_points = set()
-
         # Start by identifying units that are about to head into conflict
 
-        squares_claimed_by_team: Dict[Team, Dict[Tuple[int, int], List[Tuple[int, int]]]] = {
-            Team.ORANGE: {},
-            Team.APPLE: {}
-        }  # Format is team -> claimed_square -> claimed_by_squares
-
-        conflicts = {}
-        same_team_conflicts = {}
-
+        claims = []
         for row_idx, row in enumerate(self.tiles):
             for col_idx, tile in enumerate(row):
                 if tile.unit is not None:
                     faced_tile, f_row_idx, f_col_idx = self.get_faced_tile(row_idx, col_idx)
 
                     if faced_tile is not None and faced_tile.type.value.is_passable:
-                        for team in squares_claimed_by_team:
-                            if (f_row_idx, f_col_idx) in squares_claimed_by_team[team]:
-                                other_claimants = squares_claimed_by_team[team][(f_row_idx, f_col_idx)]
-                                if team != tile.unit.team:
-                                    if (f_row_idx, f_col_idx) not in conflicts:
-                                        conflicts[(f_row_idx, f_col_idx)] = self.Conflict(set())
-                                    conflicts[(f_row_idx, f_col_idx)].belligerent_coordinates.add((row_idx, col_idx))
-                                    conflicts[(f_row_idx, f_col_idx)].belligerent_coordinates.update(other_claimants)
-                                else:
-                                    if (f_row_idx, f_col_idx) not in same_team_conflicts:
-                                        same_team_conflicts[(f_row_idx, f_col_idx)] = self.Conflict(set())
-                                    same_team_conflicts[(f_row_idx, f_col_idx)].belligerent_coordinates.add(
-                                        (row_idx, col_idx))
-                                    same_team_conflicts[(f_row_idx, f_col_idx)].belligerent_coordinates.update(
-                                        other_claimants)
-                        if (f_row_idx, f_col_idx) not in squares_claimed_by_team[tile.unit.team]:
-                            squares_claimed_by_team[tile.unit.team][(f_row_idx, f_col_idx)] = []
-
-                        squares_claimed_by_team[tile.unit.team][(f_row_idx, f_col_idx)].append((row_idx, col_idx))
-
-        # For the same-team conflicts, we need to play traffic cop and decide which one goes first.
-        # Rule (arbitrary) is that the one with the highest row_idx goes first, then one with highest col_idx
-        for conflict_point in same_team_conflicts:
-            conflict = same_team_conflicts[conflict_point]
-            print("belligerent points", conflict.belligerent_coordinates)
-
-            ok_to_move = max(conflict.belligerent_coordinates)
-            stuck_unit_points.update(
-                [b_point for b_point in conflict.belligerent_coordinates if b_point != ok_to_move]
-            )
-            print("stuck points", stuck_unit_points)
-
-        # Now we still need to find squares where two enemy units are moving past one another but not directly onto the same square
-
-        for team in squares_claimed_by_team:
-            for claimed_square in squares_claimed_by_team[team]:
-                claimants = squares_claimed_by_team[team][claimed_square]
-                for claimant in claimants:
-                    passing_conflict = self.get_passing_conflict(claimant, claimed_square, squares_claimed_by_team)
-                    if passing_conflict is not None:
-                        # Check if the passing conflict needs to be combined with an existing one
-                        combined_with_conflict = False
-                        for belligerent_point in passing_conflict.belligerent_coordinates:
-                            if belligerent_point in conflicts:
-                                conflicts[belligerent_point].belligerent_coordinates.update(
-                                    passing_conflict.belligerent_coordinates)
-                                combined_with_conflict = True
-                                break
-                        if not combined_with_conflict:
-                            conflicts[claimed_square] = passing_conflict
+                        claims.append(Claim((row_idx, col_idx), tile.unit.team, (f_row_idx, f_col_idx)))
+
+        conflicts, stuck_unit_points = find_conflicts(claims, list(Team))
 
         # Resolve all conflicts
 
@@ -367,68 +381,18 @@ class Board:
 
         # Iterate over all units on the board, finding each ones' chain.
 
+        facing = {}
         for row_idx, row in enumerate(self.tiles):
             for col_idx, tile in enumerate(row):
-                if (row_idx, col_idx) in identified_unit_points:
-                    continue
                 if tile.unit is not None:
-                    chain = self.extract_chain(row_idx, col_idx, stuck_unit_points)
-                    if chain is not None:
-                        identified_unit_points.update(chain)
-
-                        # Remove any smaller subchains that were identified earlier
-                        chains_to_remove = set()
-                        for starting_point in chains_starting_points:
-                            if starting_point in chain:
-                                chains_to_remove.add(starting_point)
-
-                        for chain_to_remove in chains_to_remove:
-                            chains_starting_points.pop(chain_to_remove)
-
-                        chains_starting_points[(row_idx, col_idx)] = chain
+                    faced_tile, f_row_idx, f_col_idx = self.get_faced_tile(row_idx, col_idx)
+                    if faced_tile is None or not faced_tile.type.value.is_passable:
+                        facing[(row_idx, col_idx)] = None
                     else:
-                        locked_unit_points.add((row_idx, col_idx))
-
-        return list(chains_starting_points.values()), locked_unit_points, victims
-
-    def get_passing_conflict(self, opponent: Tuple[int, int], opp_claimed_square: Tuple[int, int],
-                             squares_claimed_by_team: Dict[str, Dict[Tuple[int, int], List[Tuple[int, int]]]]) -> \
-    Optional[Conflict]:
-        for team in squares_claimed_by_team:
-            for claimed_square in squares_claimed_by_team[team]:
-                if claimed_square == opponent and opp_claimed_square in squares_claimed_by_team[team][claimed_square]:
-                    return self.Conflict({opponent, opp_claimed_square})
-        return None
-
-    def extract_chain(self, row_idx: int, col_idx: int, stuck_unit_points=None,
-                      visited_points: Set[Tuple[int, int]] = None) -> Optional[List[Tuple[int, int]]]:
-        """
-        Returns a chain of units that must move in order, starting from the specified row_idx, col_idx.
-        Returns None if the unit cannot move
-        """
-
-        if stuck_unit_points is None:
-            stuck_unit_points = set()
-        if visited_points is None:
-            visited_points = set()
-
-        if (row_idx, col_idx) in stuck_unit_points or (row_idx, col_idx) in visited_points:
-            return None
-
-        faced_tile, f_row_idx, f_col_idx = self.get_faced_tile(row_idx, col_idx)
-
-        if faced_tile is None or not faced_tile.type.value.is_passable:
-            return None
-        if faced_tile.is_free():
-            return [(row_idx, col_idx)]
-
-        # If the faced tile is occupied by a unit that is also free to move next turn, we can move to it
+                        facing[(row_idx, col_idx)] = (f_row_idx, f_col_idx)
 
-        chain = self.extract_chain(f_row_idx, f_col_idx, stuck_unit_points, visited_points.union({(row_idx, col_idx)}))
-        if chain is not None:
-            return chain + [(row_idx, col_idx)]
-        else:
-            return None
+        chains, locked_unit_points = resolve_chains(facing, stuck_unit_points)
+        return chains, locked_unit_points, victims
 
     def get_number_of_units_by_team(self, team: Team) -> int:
         count = 0
@@ -443,19 +407,28 @@ class Board:
         for col_idx in range(len(self.tiles[0])):
             new_row.append(Tile(TileType.GRASS,None,False,5,Direction.RIGHT, (0,0)))
         self.tiles.append(new_row)
+        self.mark_all_dirty()
+        # A row deleted and added back leaves the board its old size, so the renderer only redraws what's marked
+        for col_idx in range(len(new_row)):
+            self.mark_terrain_dirty(len(self.tiles) - 1, col_idx)
 
     def del_row(self):
         if len(self.tiles) > 1:
             self.tiles.pop()
+            self.mark_all_dirty()
 
     def add_col(self):
         for row in self.tiles:
             row.append(Tile(TileType.GRASS,None,False,5,Direction.RIGHT, (0,0)))
+        self.mark_all_dirty()
+        for row_idx in range(len(self.tiles)):
+            self.mark_terrain_dirty(row_idx, len(self.tiles[0]) - 1)
 
     def del_col(self):
         if len(self.tiles[0]) > 1:
             for row in self.tiles:
                 row.pop()
+            self.mark_all_dirty()
 
     def get_faced_tile(self, row_idx: int, col_idx: int) -> Tuple[Optional[Tile], int, int]:
         """
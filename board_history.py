@@ -0,0 +1,250 @@
+from typing import Dict, List, NamedTuple, Optional, Set, Tuple
+
+from board import Board
+from unit import Team, Tile, Unit
+
+Square = Tuple[int, int]
+Shape = Tuple[int, int]  # Rows, columns
+
+
+class HistoryStep(NamedTuple):
+    "The squares that differ between two neighbouring entries of the history, with their tiles before and after"
+    old_shape: Shape
+    new_shape: Shape
+    changes: Dict[Square, Tuple[Optional[Tile], Optional[Tile]]]  # None where the square is off the board
+
+
+class Counters(NamedTuple):
+    updates: int
+    finished_units_by_team: Dict[Team, int]
+    units_killed_by_team: Dict[Team, int]
+
+
+def copy_tile(tile: Tile) -> Tile:
+    "Unlike deepcopy, keeps the unit's defense, so a copy compares equal to the tile it was copied from"
+    unit = None
+    if tile.unit is not None:
+        unit = Unit(tile.unit.type, tile.unit.direction, tile.unit.team)
+        unit.defense = tile.unit.defense
+    return Tile(tile.type, unit, tile.is_placeable, tile.health, tile.rotation, tile.destination)
+
+
+def get_shape(tiles: List[List[Optional[Tile]]]) -> Shape:
+    return len(tiles), len(tiles[0]) if tiles else 0
+
+
+def resize(tiles: List[List[Optional[Tile]]], shape: Shape):
+    "Crops or pads the grid in place to shape. New squares are None until something fills them in"
+    height, width = shape
+    del tiles[height:]
+    for row in tiles:
+        del row[width:]
+        row.extend([None] * (width - len(row)))
+    tiles.extend([None] * width for _ in range(height - len(tiles)))
+
+
+class BoardHistory:
+    """
+    Undo history for the level editor's step button. There's an entry for the board before every step, and a last one
+    for the board after the latest step.
+    Only the squares that differ between neighbouring entries are stored, as private copies of their tiles. The entry
+    being looked at is also kept whole, sharing those copies, so moving between entries costs only the squares that
+    differ. Edits made since arriving at an entry are tracked by square, and thrown away on moving to another entry.
+    """
+
+    def __init__(self, tile_limit: int = 200_000):
+        self.tile_limit = tile_limit  # Past this many stored tiles, the oldest steps are merged and can't be stepped to
+        self.board: Optional[Board] = None  # The board being tracked, or None while the history is empty
+        self.tiles: List[List[Optional[Tile]]] = []  # The entry at index
+        self.steps: List[HistoryStep] = []  # steps[i] goes from entry i to entry i + 1
+        self.counters: List[Counters] = []
+        self.index = 0
+        self.edited: Set[Square] = set()
+        self.stored_tiles = 0
+
+    def step(self, board: Board, frame: int) -> bool:
+        "Updates the board, recording it as it was before and after the update. Returns whether the update changed it"
+        if self.board is not board:
+            self.start(board)
+        elif self.index < len(self.steps):
+            # Stepping while looking back replays the latest update, from the entry before it
+            self.go_to(board, len(self.steps) - 1)
+            board.update_strength_defense(frame)
+            self.forget_after(self.index)
+            self.add_step(self.record_edits(board), self.counters[-1])
+        elif self.steps:
+            # The latest entry, with any edits since, becomes the entry before this update
+            self.steps[-1] = self.combine(self.steps[-1], self.record_edits(board))
+
+        change = board.update(frame)
+        self.add_step(self.record_update(board), self.get_counters(board))
+        self.trim()
+        return change
+
+    def step_back(self, board: Board):
+        if self.board is board and self.index > 0:
+            self.go_to(board, self.index - 1)
+
+    def reset(self, board: Board):
+        "Puts the board back to how it was before the first step, and empties the history"
+        if self.board is board:
+            self.go_to(board, 0)
+            self.discard_edits(board)
+        self.__init__(self.tile_limit)
+
+    def edit(self, board: Board, row_idx: int, col_idx: int):
+        "Records that a square of the board was edited by hand"
+        if self.board is board:
+            self.edited.add((row_idx, col_idx))
+
+    def add_row(self, board: Board):
+        board.add_row()
+        self.edit_row(board, len(board.tiles) - 1)
+
+    def del_row(self, board: Board):
+        if len(board.tiles) > 1:
+            self.edit_row(board, len(board.tiles) - 1)
+            board.del_row()
+
+    def add_col(self, board: Board):
+        board.add_col()
+        self.edit_col(board, len(board.tiles[0]) - 1)
+
+    def del_col(self, board: Board):
+        if len(board.tiles[0]) > 1:
+            self.edit_col(board, len(board.tiles[0]) - 1)
+            board.del_col()
+
+    def edit_row(self, board: Board, row_idx: int):
+        for col_idx in range(len(board.tiles[0])):
+            self.edit(board, row_idx, col_idx)
+
+    def edit_col(self, board: Board, col_idx: int):
+        for row_idx in range(len(board.tiles)):
+            self.edit(board, row_idx, col_idx)
+
+    def start(self, board: Board):
+        self.__init__(self.tile_limit)
+        self.board = board
+        self.tiles = [[copy_tile(tile) for tile in row] for row in board.tiles]
+        self.counters = [self.get_counters(board)]
+
+    def go_to(self, board: Board, index: int):
+        if index == self.index:
+            return
+        self.discard_edits(board)
+        while self.index > index:
+            self.index -= 1
+            self.apply(board, self.steps[self.index], False)
+        while self.index < index:
+            self.apply(board, self.steps[self.index], True)
+            self.index += 1
+
+        counters = self.counters[index]
+        board.updates = counters.updates
+        board.finished_units_by_team = dict(counters.finished_units_by_team)
+        board.units_killed_by_team = dict(counters.units_killed_by_team)
+        board.animations = []
+
+    def apply(self, board: Board, step: HistoryStep, forward: bool):
+        shape = step.new_shape if forward else step.old_shape
+        if shape != get_shape(self.tiles):
+            resize(self.tiles, shape)
+            resize(board.tiles, shape)
+            board.mark_all_dirty()
+        for (row_idx, col_idx), (old_tile, new_tile) in step.changes.items():
+            tile = new_tile if forward else old_tile
+            if tile is not None:
+                self.tiles[row_idx][col_idx] = tile
+                self.restore(board, row_idx, col_idx)
+
+    def restore(self, board: Board, row_idx: int, col_idx: int):
+        board.tiles[row_idx][col_idx] = copy_tile(self.tiles[row_idx][col_idx])
+        board.mark_dirty(row_idx, col_idx)
+        board.mark_terrain_dirty(row_idx, col_idx)
+
+    def discard_edits(self, board: Board):
+        height, width = get_shape(self.tiles)
+        if get_shape(board.tiles) != (height, width):
+            resize(board.tiles, (height, width))
+            board.mark_all_dirty()
+        for row_idx, col_idx in self.edited:
+            if row_idx < height and col_idx < width:
+                self.restore(board, row_idx, col_idx)
+        self.edited = set()
+
+    def record_edits(self, board: Board) -> HistoryStep:
+        "Brings the entry at index up to date with the edits made on the board, returning what they changed"
+        old_shape = get_shape(self.tiles)
+        new_shape = get_shape(board.tiles)
+        old_tiles = {square: self.get_tile(square) for square in self.edited}
+        if new_shape != old_shape:
+            resize(self.tiles, new_shape)
+
+        changes = {}
+        for (row_idx, col_idx), old_tile in old_tiles.items():
+            new_tile = None
+            if row_idx < new_shape[0] and col_idx < new_shape[1]:
+                new_tile = copy_tile(board.tiles[row_idx][col_idx])
+            if new_tile != old_tile:
+                changes[(row_idx, col_idx)] = (old_tile, new_tile)
+                if new_tile is not None:
+                    self.tiles[row_idx][col_idx] = new_tile
+        self.edited = set()
+        return HistoryStep(old_shape, new_shape, changes)
+
+    def record_update(self, board: Board) -> HistoryStep:
+        "An update replaces every tile, so finding what it changed means comparing the whole board"
+        shape = get_shape(self.tiles)
+        changes = {}
+        for row_idx, (row, new_row) in enumerate(zip(self.tiles, board.tiles)):
+            for col_idx, (old_tile, tile) in enumerate(zip(row, new_row)):
+                if tile != old_tile:
+                    new_tile = copy_tile(tile)
+                    changes[(row_idx, col_idx)] = (old_tile, new_tile)
+                    row[col_idx] = new_tile
+        return HistoryStep(shape, shape, changes)
+
+    def get_tile(self, square: Square) -> Optional[Tile]:
+        row_idx, col_idx = square
+        height, width = get_shape(self.tiles)
+        return self.tiles[row_idx][col_idx] if row_idx < height and col_idx < width else None
+
+    def combine(self, first: HistoryStep, second: HistoryStep) -> HistoryStep:
+        "One step that does first, then second"
+        self.stored_tiles -= len(first.changes)
+        changes = dict(first.changes)
+        for square, (old_tile, new_tile) in second.changes.items():
+            if square in changes:
+                old_tile = changes[square][0]
+            if new_tile != old_tile:
+                changes[square] = (old_tile, new_tile)
+            else:
+                changes.pop(square, None)
+        self.stored_tiles += len(changes)
+        return HistoryStep(first.old_shape, second.new_shape, changes)
+
+    def add_step(self, step: HistoryStep, counters: Counters):
+        self.steps.append(step)
+        self.counters.append(counters)
+        self.stored_tiles += len(step.changes)
+        self.index += 1
+
+    def forget_after(self, index: int):
+        for step in self.steps[index:]:
+            self.stored_tiles -= len(step.changes)
+        del self.steps[index:]
+        del self.counters[index + 1:]
+
+    def trim(self):
+        "Merges the oldest steps into one, so the entry reset goes back to, the level as it was designed, is never lost"
+        while self.stored_tiles > self.tile_limit and len(self.steps) > 1 and self.index > 1:
+            second = self.steps.pop(1)
+            self.stored_tiles -= len(second.changes)
+            self.steps[0] = self.combine(self.steps[0], second)
+            self.counters.pop(1)
+            self.index -= 1
+
+    @staticmethod
+    def get_counters(board: Board) -> Counters:
+        return Counters(board.updates, dict(board.finished_units_by_team), dict(board.units_killed_by_team))
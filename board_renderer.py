@@ -0,0 +1,137 @@
+from typing import Dict, Tuple
+from weakref import WeakKeyDictionary
+
+import pygame
+from pygame import Surface
+
+from animations import UnitMovementAnimation, StaticUnitAnimation, UnitDeathAnimation, UnitWinAnimation, FlankAnimation
+from board import Board
+from constants import SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE
+from events import SimulationEvent, UnitMoved, UnitHeld, UnitKilled, UnitExited, FlankFormed, FlanksCleared
+from gamemode import GameMode
+from unit import Tile
+
+
+def record_animation(board: Board, frame: int, event: SimulationEvent):
+    "Board event subscriber that turns simulation events into the animations drawn by render_board"
+    match event:
+        case UnitMoved(unit, row_idx, col_idx, direction):
+            board.animations.append(
+                UnitMovementAnimation(frame, unit, board.col_to_x(col_idx), board.row_to_y(row_idx), direction))
+        case UnitHeld(unit, row_idx, col_idx):
+            board.animations.append(StaticUnitAnimation(frame, unit, board.col_to_x(col_idx), board.row_to_y(row_idx)))
+        case UnitKilled(unit, row_idx, col_idx):
+            board.animations.append(UnitDeathAnimation(frame, unit, board.col_to_x(col_idx), board.row_to_y(row_idx)))
+        case UnitExited(unit, row_idx, col_idx):
+            board.animations.append(UnitWinAnimation(frame, unit, board.col_to_x(col_idx), board.row_to_y(row_idx)))
+        case FlankFormed(col_idx, start_row_idx, end_row_idx):
+            board.flank_animations.setdefault(col_idx, []).append(
+                FlankAnimation(frame, board.row_to_y(start_row_idx), board.row_to_y(end_row_idx), board.col_to_x(col_idx)))
+        case FlanksCleared(col_idx):
+            board.flank_animations.pop(col_idx, None)
+
+
+DARK_TILE = pygame.Surface((TILE_SIZE, TILE_SIZE), pygame.SRCALPHA)
+DARK_TILE.fill((0, 0, 0, 100))  # Semi-transparent black overlay
+
+
+def is_dark_tile(tile: Tile) -> bool:
+    "Whether the tile is darkened in placement mode, for not being passable or not placeable"
+    return not tile.type.value.is_passable or not tile.is_placeable
+
+
+class TerrainLayer:
+    """
+    A board's tiles and border pre-rendered onto one surface, with a second copy that has the placement mode darkening
+    baked in. Only the tiles in Board.dirty_terrain are redrawn; a resized board is redrawn from scratch.
+    """
+
+    def __init__(self):
+        self.board_size: Tuple[int, int] = (0, 0)
+        self.surfaces: Dict[bool, Surface] = {}
+
+    def get_surface(self, board: Board, dark: bool) -> Surface:
+        board_size = (len(board.tiles), len(board.tiles[0]))
+        if board_size != self.board_size:
+            self.board_size = board_size
+            self.surfaces = {}
+            board.dirty_terrain.clear()
+
+        for row_idx, col_idx in board.dirty_terrain:
+            for surface_dark, surface in self.surfaces.items():
+                self.draw_tile(surface, board.tiles[row_idx][col_idx], row_idx, col_idx, surface_dark)
+        board.dirty_terrain.clear()
+
+        if dark not in self.surfaces:
+            self.surfaces[dark] = self.draw_terrain(board, dark)
+        return self.surfaces[dark]
+
+    def draw_terrain(self, board: Board, dark: bool) -> Surface:
+        rows, cols = self.board_size
+        surface = pygame.Surface((TILE_SIZE * cols + 16, TILE_SIZE * rows + 16))
+        pygame.draw.rect(surface, (0, 0, 0), surface.get_rect(), width=8)
+        for row_idx, row in enumerate(board.tiles):
+            for col_idx, tile in enumerate(row):
+                self.draw_tile(surface, tile, row_idx, col_idx, dark)
+        return surface
+
+    @staticmethod
+    def draw_tile(surface: Surface, tile: Tile, row_idx: int, col_idx: int, dark: bool):
+        tile_x = 8 + col_idx * TILE_SIZE
+        tile_y = 8 + row_idx * TILE_SIZE
+        tile.render(surface, tile_x, tile_y)
+        if dark and is_dark_tile(tile):
+            surface.blit(DARK_TILE, (tile_x, tile_y))
+
+
+terrain_layers: "WeakKeyDictionary[Board, TerrainLayer]" = WeakKeyDictionary()
+
+
+def get_board_rect(board: Board) -> pygame.Rect:
+    "The screen area render_board draws into, with room for units that die or win past the edge of the board"
+    width, height = len(board.tiles[0]) * TILE_SIZE, len(board.tiles) * TILE_SIZE
+    rect = pygame.Rect((SCREEN_WIDTH - width) // 2 - 8, (SCREEN_HEIGHT - height) // 2 - 8, width + 16, height + 16)
+    return rect.inflate(4 * TILE_SIZE, 4 * TILE_SIZE)
+
+
+def is_board_animated(board: Board) -> bool:
+    return len(board.animations) > 0 or any(board.flank_animations.values())
+
+
+def render_board(board: Board, screen: Surface, game_state: GameMode, frame: int, dark=False):
+    tiles = board.tiles
+
+    # Calculate the offsets to center the board on the screen
+    offset_x = (SCREEN_WIDTH - len(tiles[0]) * TILE_SIZE) // 2
+    offset_y = (SCREEN_HEIGHT - len(tiles) * TILE_SIZE) // 2
+
+    # Darken tiles that are not passable or not placeable
+    dark = dark or game_state == GameMode.EDIT_TROOPS
+
+    if board not in terrain_layers:
+        terrain_layers[board] = TerrainLayer()
+    terrain_layer = terrain_layers[board]
+    screen.blit(terrain_layer.get_surface(board, dark), (offset_x - 8, offset_y - 8))
+
+    # Render the units (AND only in edit mode cuz if not, the animations draw them)
+    # len(animations) == 0 is a total hack, to patch the first frame of play mode where animations haven't been populated yet
+    if game_state != GameMode.PLAY_TROOPS or len(board.animations) == 0:
+        for row_idx, row in enumerate(tiles):
+            for col_idx, tile in enumerate(row):
+                if tile.unit is not None:
+                    tile_x = offset_x + col_idx * TILE_SIZE
+                    tile_y = offset_y + row_idx * TILE_SIZE
+                    if dark and is_dark_tile(tile):
+                        # The darkening goes over the unit as well as the tile, so start again from the plain tile
+                        screen.blit(terrain_layer.get_surface(board, False), (tile_x, tile_y),
+                                    pygame.Rect(8 + col_idx * TILE_SIZE, 8 + row_idx * TILE_SIZE, TILE_SIZE, TILE_SIZE))
+                        screen.blit(tile.unit.get_image(), (tile_x, tile_y))
+                        screen.blit(DARK_TILE, (tile_x, tile_y))
+                    else:
+                        screen.blit(tile.unit.get_image(), (tile_x, tile_y))
+
+    for animation in board.animations:
+        animation.draw(screen, frame, game_state)
+    for flank_animations in board.flank_animations.values():
+        for animation in flank_animations:
+            animation.draw(screen, frame, game_state)
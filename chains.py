@@ -0,0 +1,72 @@
+from typing import Dict, List, Optional, Set, Tuple
+
+
+def resolve_chains(facing: Dict[Tuple[int, int], Optional[Tuple[int, int]]],
+                   stuck_unit_points: Set[Tuple[int, int]]) -> Tuple[List[List[Tuple[int, int]]], Set[Tuple[int, int]]]:
+    """
+    Returns a tuple with two elements.
+    The first is a list of chains. Each chain has points in order of how they needed to move, front unit first.
+    The second is the set of units that cannot move.
+
+    facing maps every unit, in row-major order, to the square it faces, or None if that square is off the board or
+    impassable. Every unit faces at most one other unit, so the units form a functional graph: a unit can move iff
+    following it forward ends on a free square without passing a stuck unit or going round a cycle. That is worked
+    out once per unit without recursion, and each chain is only built for the unit at its back.
+    """
+
+    # First, whether each unit can move, reusing the answer for every unit already walked through
+    can_move: Dict[Tuple[int, int], bool] = {}
+    for start in facing:
+        walk = []
+        on_walk = set()
+        point = start
+        while point not in can_move:
+            if point in on_walk:
+                # Came back round to a unit on this walk, so everything walked is in or behind a cycle
+                result = False
+                break
+            walk.append(point)
+            on_walk.add(point)
+            faced_point = facing[point]
+            if point in stuck_unit_points or faced_point is None:
+                result = False
+                break
+            if faced_point not in facing:
+                result = True
+                break
+            point = faced_point
+        else:
+            result = can_move[point]
+        for walked_point in walk:
+            can_move[walked_point] = result
+
+    # Then, one chain per unit that is not already part of a chain found earlier in row-major order. A chain swallows
+    # any earlier chain it runs into, and since the points ahead of an already identified unit are all identified,
+    # the only earlier chain it can run into starts at the first identified unit it reaches.
+    chains_starting_points: Dict[Tuple[int, int], None] = {}
+    identified_unit_points = set()
+    locked_unit_points = set()
+    for start in facing:
+        if start in identified_unit_points:
+            continue
+        if not can_move[start]:
+            locked_unit_points.add(start)
+            continue
+        point = start
+        while point in facing and point not in identified_unit_points:
+            identified_unit_points.add(point)
+            point = facing[point]
+        chains_starting_points.pop(point, None)
+        chains_starting_points[start] = None
+
+    chains = []
+    for start in chains_starting_points:
+        chain = []
+        point = start
+        while point in facing:
+            chain.append(point)
+            point = facing[point]
+        chain.reverse()
+        chains.append(chain)
+
+    return chains, locked_unit_points
@@ -0,0 +1,160 @@
+"""
+Differential harness for conflicts.find_conflicts.
+
+Runs the indexed detector and the original quadratic scan from Board.identify_chains side by side on random boards and
+on every shipped level, and reports any board where they disagree. Conflict sets are compared in iteration order too,
+since resolve_conflict breaks defense ties by that order.
+
+    python check_conflicts.py [--boards N] [--seed S]
+"""
+import argparse
+import random
+from typing import Dict, List, Optional, Set, Tuple
+
+from board import Board
+from conflicts import Conflict, Claim, find_conflicts
+from unit import Tile, TileType, Unit, UnitType, Direction, Team
+
+
+def legacy_get_passing_conflict(opponent: Tuple[int, int], opp_claimed_square: Tuple[int, int],
+                                squares_claimed_by_team: Dict[Team, Dict[Tuple[int, int], List[Tuple[int, int]]]]) -> \
+        Optional[Conflict]:
+    for team in squares_claimed_by_team:
+        for claimed_square in squares_claimed_by_team[team]:
+            if claimed_square == opponent and opp_claimed_square in squares_claimed_by_team[team][claimed_square]:
+                return Conflict({opponent, opp_claimed_square})
+    return None
+
+
+def legacy_find_conflicts(board: Board) -> Tuple[Dict[Tuple[int, int], Conflict], Set[Tuple[int, int]]]:
+    "The conflict detection from Board.identify_chains before it was indexed, kept verbatim as the reference"
+    stuck_unit_points = set()
+
+    squares_claimed_by_team: Dict[Team, Dict[Tuple[int, int], List[Tuple[int, int]]]] = {
+        Team.ORANGE: {},
+        Team.APPLE: {}
+    }
+
+    conflicts = {}
+    same_team_conflicts = {}
+
+    for row_idx, row in enumerate(board.tiles):
+        for col_idx, tile in enumerate(row):
+            if tile.unit is not None:
+                faced_tile, f_row_idx, f_col_idx = board.get_faced_tile(row_idx, col_idx)
+
+                if faced_tile is not None and faced_tile.type.value.is_passable:
+                    for team in squares_claimed_by_team:
+                        if (f_row_idx, f_col_idx) in squares_claimed_by_team[team]:
+                            other_claimants = squares_claimed_by_team[team][(f_row_idx, f_col_idx)]
+                            if team != tile.unit.team:
+                                if (f_row_idx, f_col_idx) not in conflicts:
+                                    conflicts[(f_row_idx, f_col_idx)] = Conflict(set())
+                                conflicts[(f_row_idx, f_col_idx)].belligerent_coordinates.add((row_idx, col_idx))
+                                conflicts[(f_row_idx, f_col_idx)].belligerent_coordinates.update(other_claimants)
+                            else:
+                                if (f_row_idx, f_col_idx) not in same_team_conflicts:
+                                    same_team_conflicts[(f_row_idx, f_col_idx)] = Conflict(set())
+                                same_team_conflicts[(f_row_idx, f_col_idx)].belligerent_coordinates.add(
+                                    (row_idx, col_idx))
+                                same_team_conflicts[(f_row_idx, f_col_idx)].belligerent_coordinates.update(
+                                    other_claimants)
+                    if (f_row_idx, f_col_idx) not in squares_claimed_by_team[tile.unit.team]:
+                        squares_claimed_by_team[tile.unit.team][(f_row_idx, f_col_idx)] = []
+
+                    squares_claimed_by_team[tile.unit.team][(f_row_idx, f_col_idx)].append((row_idx, col_idx))
+
+    for conflict_point in same_team_conflicts:
+        conflict = same_team_conflicts[conflict_point]
+
+        ok_to_move = max(conflict.belligerent_coordinates)
+        stuck_unit_points.update(
+            [b_point for b_point in conflict.belligerent_coordinates if b_point != ok_to_move]
+        )
+
+    for team in squares_claimed_by_team:
+        for claimed_square in squares_claimed_by_team[team]:
+            claimants = squares_claimed_by_team[team][claimed_square]
+            for claimant in claimants:
+                passing_conflict = legacy_get_passing_conflict(claimant, claimed_square, squares_claimed_by_team)
+                if passing_conflict is not None:
+                    combined_with_conflict = False
+                    for belligerent_point in passing_conflict.belligerent_coordinates:
+                        if belligerent_point in conflicts:
+                            conflicts[belligerent_point].belligerent_coordinates.update(
+                                passing_conflict.belligerent_coordinates)
+                            combined_with_conflict = True
+                            break
+                    if not combined_with_conflict:
+                        conflicts[claimed_square] = passing_conflict
+
+    return conflicts, stuck_unit_points
+
+
+def indexed_find_conflicts(board: Board) -> Tuple[Dict[Tuple[int, int], Conflict], Set[Tuple[int, int]]]:
+    claims = []
+    for row_idx, row in enumerate(board.tiles):
+        for col_idx, tile in enumerate(row):
+            if tile.unit is not None:
+                faced_tile, f_row_idx, f_col_idx = board.get_faced_tile(row_idx, col_idx)
+                if faced_tile is not None and faced_tile.type.value.is_passable:
+                    claims.append(Claim((row_idx, col_idx), tile.unit.team, (f_row_idx, f_col_idx)))
+    return find_conflicts(claims, list(Team))
+
+
+def random_board(rng: random.Random, height: int, width: int, unit_density: float) -> Board:
+    tile_types = [TileType.GRASS] * 6 + [TileType.WATER, TileType.WALL, TileType.TRAMPOLINE, TileType.TRAPDOOR]
+    tiles = []
+    for row_idx in range(height):
+        tile_row = []
+        for col_idx in range(width):
+            tile_type = rng.choice(tile_types)
+            unit = None
+            if tile_type.value.is_passable and rng.random() < unit_density:
+                unit = Unit(rng.choice(list(UnitType)), rng.choice(list(Direction)), rng.choice(list(Team)))
+            tile_row.append(Tile(tile_type, unit))
+        tiles.append(tile_row)
+    return Board(tiles)
+
+
+def describe(conflicts: Dict[Tuple[int, int], Conflict]) -> List[Tuple[Tuple[int, int], List[Tuple[int, int]]]]:
+    return [(square, list(conflict.belligerent_coordinates)) for square, conflict in conflicts.items()]
+
+
+def boards_match(board: Board) -> bool:
+    legacy_conflicts, legacy_stuck = legacy_find_conflicts(board)
+    conflicts, stuck = indexed_find_conflicts(board)
+    return describe(legacy_conflicts) == describe(conflicts) and legacy_stuck == stuck
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the indexed conflict detector against the original scan")
+    parser.add_argument("--boards", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--levels", default="new_levels.json")
+    args = parser.parse_args()
+
+    from savedata import load_levels
+
+    rng = random.Random(args.seed)
+    boards = [level.board for level in load_levels(args.levels)]
+    for _ in range(args.boards):
+        boards.append(random_board(rng, rng.randint(1, 16), rng.randint(1, 16), rng.choice([0.2, 0.5, 0.9])))
+
+    mismatches = 0
+    for board_idx, board in enumerate(boards):
+        # Play a few ticks of each board so conflicts come from real formations, not just the opening layout
+        for _ in range(8):
+            if not boards_match(board):
+                mismatches += 1
+                print(f"Mismatch on board {board_idx} after {board.updates} updates")
+                break
+            if not board.update(0):
+                break
+
+    print(f"{len(boards)} boards checked, {mismatches} mismatches")
+    raise SystemExit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+from typing import NamedTuple, Set, Tuple, Dict, List, Hashable, Iterable
+
+
+class Conflict(NamedTuple):
+    belligerent_coordinates: Set[Tuple[int, int]]
+
+
+class Claim(NamedTuple):
+    "A unit at point, on team, that is about to step onto the passable square target"
+    point: Tuple[int, int]
+    team: Hashable
+    target: Tuple[int, int]
+
+
+def find_conflicts(claims: Iterable[Claim], teams: List[Hashable]) -> \
+        Tuple[Dict[Tuple[int, int], Conflict], Set[Tuple[int, int]]]:
+    """
+    Returns a tuple with two elements.
+    The first maps a square to the conflict fought over it, both enemies stepping onto the same square and enemies
+    swapping squares head-on. The second is the set of units held back by a same-team unit claiming the same square.
+    Claims must come in row-major order of the claiming units. Every square is looked up in a reverse map from target
+    to claimants, so this is linear in the number of units.
+    """
+    squares_claimed_by_team: Dict[Hashable, Dict[Tuple[int, int], List[Tuple[int, int]]]] = {
+        team: {}
+        for team in teams
+    }  # Format is team -> claimed_square -> claimed_by_squares
+    target_by_claimant: Dict[Tuple[int, int], Tuple[int, int]] = {}
+
+    conflicts = {}
+    same_team_conflicts = {}
+    stuck_unit_points = set()
+
+    for point, unit_team, target in claims:
+        for team in squares_claimed_by_team:
+            if target in squares_claimed_by_team[team]:
+                other_claimants = squares_claimed_by_team[team][target]
+                if team != unit_team:
+                    if target not in conflicts:
+                        conflicts[target] = Conflict(set())
+                    conflicts[target].belligerent_coordinates.add(point)
+                    conflicts[target].belligerent_coordinates.update(other_claimants)
+                else:
+                    if target not in same_team_conflicts:
+                        same_team_conflicts[target] = Conflict(set())
+                    same_team_conflicts[target].belligerent_coordinates.add(point)
+                    same_team_conflicts[target].belligerent_coordinates.update(other_claimants)
+        if target not in squares_claimed_by_team[unit_team]:
+            squares_claimed_by_team[unit_team][target] = []
+
+        squares_claimed_by_team[unit_team][target].append(point)
+        target_by_claimant[point] = target
+
+    # For the same-team conflicts, we need to play traffic cop and decide which one goes first.
+    # Rule (arbitrary) is that the one with the highest row_idx goes first, then one with highest col_idx
+    for conflict in same_team_conflicts.values():
+        ok_to_move = max(conflict.belligerent_coordinates)
+        stuck_unit_points.update(
+            [b_point for b_point in conflict.belligerent_coordinates if b_point != ok_to_move]
+        )
+
+    # Now we still need to find squares where two enemy units are moving past one another but not directly onto the same square.
+    # That is a claimant whose claimed square holds a unit claiming the claimant's own square.
+
+    for team in squares_claimed_by_team:
+        for claimed_square, claimants in squares_claimed_by_team[team].items():
+            for claimant in claimants:
+                if target_by_claimant.get(claimed_square) != claimant:
+                    continue
+                passing_conflict = Conflict({claimant, claimed_square})
+                # Check if the passing conflict needs to be combined with an existing one
+                combined_with_conflict = False
+                for belligerent_point in passing_conflict.belligerent_coordinates:
+                    if belligerent_point in conflicts:
+                        conflicts[belligerent_point].belligerent_coordinates.update(
+                            passing_conflict.belligerent_coordinates)
+                        combined_with_conflict = True
+                        break
+                if not combined_with_conflict:
+                    conflicts[claimed_square] = passing_conflict
+
+    return conflicts, stuck_unit_points
@@ -1,6 +1,7 @@
-from typing import Optional
+from typing import Optional, TYPE_CHECKING
 
-import pygame
+if TYPE_CHECKING:
+    import pygame
 
 SCREEN_WIDTH, SCREEN_HEIGHT = 1200, 800
 
@@ -14,6 +15,6 @@ ENABLE_EDITING = True
 GENERATE_FILE = False
 LOAD_FILE = not GENERATE_FILE
 
-big_font: Optional[pygame.font.Font] = None
-small_font: Optional[pygame.font.Font] = None
-title_font: Optional[pygame.font.Font] = None
\ No newline at end of file
+big_font: Optional["pygame.font.Font"] = None
+small_font: Optional["pygame.font.Font"] = None
+title_font: Optional["pygame.font.Font"] = None
\ No newline at end of file
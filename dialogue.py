@@ -1,24 +1,29 @@
+import re
 from enum import Enum
-from typing import Self, Tuple, List, Optional, NamedTuple, Dict
-
-import pygame
-from pygame import Surface
-from pygame.font import Font
+from typing import Self, Tuple, List, Optional, NamedTuple, Dict, TYPE_CHECKING
 
 from constants import SCREEN_WIDTH, SCREEN_HEIGHT
-from tile_images import GENERAL_IMAGE, DEFENSE_OVERLAY, OFFENSE_OVERLAY, GENERAL_APPLE_IMAGE
-
 
+if TYPE_CHECKING:
+    import pygame
+    from pygame import Surface
+    from pygame.font import Font
 
 
 class DialogueImageData(NamedTuple):
-    image: Surface
+    image_name: str
     name: str
 
+    @property
+    def image(self) -> "Surface":
+        # Looked up on first draw, so levels and their dialogue load without pygame
+        import tile_images
+        return getattr(tile_images, self.image_name)
+
 
 class DialogueImage(Enum):
-    GENERAL_ORANGE = DialogueImageData(GENERAL_IMAGE, 'GENERAL_ORANGE')
-    GENERAL_APPLE = DialogueImageData(GENERAL_APPLE_IMAGE, 'GENERAL_APPLE')
+    GENERAL_ORANGE = DialogueImageData('GENERAL_IMAGE', 'GENERAL_ORANGE')
+    GENERAL_APPLE = DialogueImageData('GENERAL_APPLE_IMAGE', 'GENERAL_APPLE')
 
     @classmethod
     def from_str(cls, sname: str):
@@ -27,8 +32,8 @@ class DialogueImage(Enum):
                 return image_type
 
 class DialogueOverlayImage(Enum):
-    OFFENSE_OVERLAY = DialogueImageData(OFFENSE_OVERLAY, 'OFFENSE_OVERLAY')
-    DEFENSE_OVERLAY = DialogueImageData(DEFENSE_OVERLAY, 'DEFENSE_OVERLAY')
+    OFFENSE_OVERLAY = DialogueImageData('OFFENSE_OVERLAY', 'OFFENSE_OVERLAY')
+    DEFENSE_OVERLAY = DialogueImageData('DEFENSE_OVERLAY', 'DEFENSE_OVERLAY')
 
     @classmethod
     def from_str(cls, sname: str):
@@ -36,6 +41,33 @@ class DialogueOverlayImage(Enum):
             if image_type.value.name == sname:
                 return image_type
 
+def get_dialogue_box_rect() -> "pygame.Rect":
+    import pygame
+
+    box_height = SCREEN_HEIGHT // 4
+    return pygame.Rect(0, SCREEN_HEIGHT - box_height, SCREEN_WIDTH, box_height)
+
+
+class WordLayout(NamedTuple):
+    start: int  # Index of the word in the dialogue text
+    end: int
+    x: int
+    line: int
+
+
+# Rendered words by (font, word, color), shared by every dialogue
+word_surfaces: Dict[Tuple["Font", str, Tuple[int, int, int]], "Surface"] = {}
+
+
+def render_word(font: "Font", word: str, color: Tuple[int, int, int]) -> "Surface":
+    key = (font, word, color)
+    surface = word_surfaces.get(key)
+    if surface is None:
+        surface = font.render(word, True, color)
+        word_surfaces[key] = surface
+    return surface
+
+
 class Dialogue:
     def __init__(self, text: str, next: Self = None, speaker_image: DialogueImage = None, presentation_image: DialogueImage= None):
         self.text = text
@@ -43,6 +75,8 @@ class Dialogue:
         self.next = next
         self.presentation_image = presentation_image
         self.first_appear_frame = None
+        self.layout: Optional[List[WordLayout]] = None
+        self.layout_font: Optional["Font"] = None
 
     @staticmethod
     def from_list(items: List[Tuple[str, Optional[DialogueImage], Optional[DialogueOverlayImage]]]):
@@ -65,12 +99,12 @@ class Dialogue:
             return False
         return (frame_count - self.first_appear_frame) >= len(self.text)
 
-    def render(self, screen: Surface, font: Font, current_frame: int, box_color: Tuple[int, int, int] = (255, 255, 255),
+    def render(self, screen: "Surface", font: "Font", current_frame: int, box_color: Tuple[int, int, int] = (255, 255, 255),
                text_color: Tuple[int, int, int] = (0, 0, 0), border_color: Tuple[int, int, int] = (0, 0, 0),
                highlight_color: Tuple[int, int, int] = (255, 165, 0)):  # Orange
-        # Box dimensions
-        box_height = SCREEN_HEIGHT // 4
-        box_rect = pygame.Rect(0, SCREEN_HEIGHT - box_height, SCREEN_WIDTH, box_height)
+        import pygame
+
+        box_rect = get_dialogue_box_rect()
 
         # Draw the border
         pygame.draw.rect(screen, border_color, box_rect, width=8)
@@ -84,51 +118,24 @@ class Dialogue:
             self.first_appear_frame = current_frame
         max_length = current_frame - self.first_appear_frame
 
-        # Prepare text to render
-        visible_text = self.text[:max_length]
-
-        # Split words, handling wrapping and highlighting
-        max_text_width = inner_box_rect.width - 40  # Account for margins
-        words = visible_text.split()
-        lines = []
-        current_line = []
-        current_line_width = 0
-
-        for word in words:
-            test_surface = font.render(word, True, text_color)
-            test_width = test_surface.get_width()
-
-            if current_line_width + test_width > max_text_width:
-                # Wrap to a new line
-                lines.append(current_line)
-                current_line = []
-                current_line_width = 0
-
-            current_line.append(word)
-            current_line_width += test_width + font.size(" ")[0]  # Add space width
-
-        # Add the last line
-        if current_line:
-            lines.append(current_line)
-
-        # Render each line of text with highlighting
+        # Reveal the words of the precomputed layout that have started typing, cutting off the one being typed
         text_y = inner_box_rect.top + 20
         line_spacing = font.get_linesize()
+        max_text_width = inner_box_rect.width - 40  # Account for margins
 
-        for line in lines:
-            text_x = inner_box_rect.left + 20
-            for word in line:
-                if word.startswith('^'):
-                    highlight_surface = font.render(word[1:], True, highlight_color)
-                    screen.blit(highlight_surface, (text_x, text_y))
-                    text_x += highlight_surface.get_width() + font.size(" ")[0]  # Add space width
-                else:
-                    # Render regular word
-                    text_surface = font.render(word, True, text_color)
-                    screen.blit(text_surface, (text_x, text_y))
-                    text_x += text_surface.get_width() + font.size(" ")[0]  # Add space width
-
-            text_y += line_spacing
+        for word_layout in self.get_layout(font, max_text_width, text_color):
+            if word_layout.start >= max_length:
+                break
+            word = self.text[word_layout.start:min(word_layout.end, max_length)]
+            color = text_color
+            if word.startswith('^'):
+                word, color = word[1:], highlight_color
+            if word_layout.end <= max_length:
+                word_surface = render_word(font, word, color)
+            else:
+                # Only whole words are cached. The one being typed is a new prefix each frame, so it's drawn as is
+                word_surface = font.render(word, True, color)
+            screen.blit(word_surface, (inner_box_rect.left + 20 + word_layout.x, text_y + word_layout.line * line_spacing))
 
         # Render speaker image, if available
         if self.speaker_image is not None:
@@ -144,6 +151,37 @@ class Dialogue:
             presentation_y = (SCREEN_HEIGHT // 2 - 3 * pr_height // 4)
             screen.blit(self.presentation_image.value.image, (presentation_x, presentation_y))
 
+    def get_layout(self, font: "Font", max_text_width: int, text_color: Tuple[int, int, int]) -> List["WordLayout"]:
+        "Wraps the whole text once, so typing it out never moves a word that's already on screen"
+        if self.layout is not None and self.layout_font is font:
+            return self.layout
+
+        space_width = font.size(" ")[0]
+        layout = []
+        line = 0
+        line_width = 0
+        text_x = 0
+        for match in re.finditer(r"\S+", self.text):
+            word = match.group()
+            test_width = render_word(font, word, text_color).get_width()
+
+            if line_width + test_width > max_text_width:
+                # Wrap to a new line
+                line += 1
+                line_width = 0
+                text_x = 0
+
+            layout.append(WordLayout(match.start(), match.end(), text_x, line))
+            line_width += test_width + space_width
+            if word.startswith('^'):
+                # Highlighted words are measured with their marker for wrapping but drawn without it
+                word = word[1:]
+            text_x += render_word(font, word, text_color).get_width() + space_width
+
+        self.layout = layout
+        self.layout_font = font
+        return layout
+
     def serialize(self) -> List[Dict[str, Optional[str]]]:
         dialogue_dict = []
         i = self
@@ -0,0 +1,43 @@
+from typing import NamedTuple, Union
+
+from unit import Unit, Direction
+
+
+class UnitMoved(NamedTuple):
+    unit: Unit
+    row_idx: int
+    col_idx: int
+    direction: Direction
+
+
+class UnitHeld(NamedTuple):
+    unit: Unit
+    row_idx: int
+    col_idx: int
+
+
+class UnitKilled(NamedTuple):
+    unit: Unit
+    row_idx: int
+    col_idx: int
+
+
+class UnitExited(NamedTuple):
+    "A unit leaving the board through a finish line or a tunnel entrance"
+    unit: Unit
+    row_idx: int
+    col_idx: int
+
+
+class FlankFormed(NamedTuple):
+    col_idx: int
+    start_row_idx: int
+    end_row_idx: int
+
+
+class FlanksCleared(NamedTuple):
+    "The flanks previously formed in a column no longer apply"
+    col_idx: int
+
+
+SimulationEvent = Union[UnitMoved, UnitHeld, UnitKilled, UnitExited, FlankFormed, FlanksCleared]
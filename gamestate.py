@@ -4,6 +4,7 @@ from board import Board
 from dialogue import Dialogue
 from gamemode import GameMode
 from level import Level
+from scheduler import Speed
 
 
 @dataclass
@@ -17,6 +18,10 @@ class GameState:
     current_dialogue: Dialogue
     frame_count: int
     placed_units: int
+    speed: Speed = Speed.NORMAL
+    # The frame animations are drawn at. Runs ahead of frame_count when play is sped up, and is fractional during play,
+    # so draw code that caches on it keys on whole frames or buckets
+    animation_frame: float = 0
 
     def data_from_level(self, level: Level):
         self.board = level.board
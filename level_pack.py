@@ -0,0 +1,232 @@
+"""
+Packed binary level files.
+
+A pack starts with a header and an index of where each level's record sits. The file is memory-mapped and a level is
+only decoded the first time something asks for it, so opening a pack costs the same however many levels it holds.
+
+    header   b"WCLP", format version (u16), level count (u32)
+    index    per level: record offset from the start of the file (u64), record length (u32)
+    record   name, bonus troops, opening dialogue as JSON, board height and width, then one tile record per square
+
+A tile record is a byte holding the tile type, the placeable flag and what follows: a byte for the unit if there is
+one, then the wall health, rotation and teleport destination, but only when they differ from Tile's defaults.
+
+    python level_pack.py pack new_levels.json levels.pack
+    python level_pack.py unpack levels.pack levels.json
+"""
+import json
+import mmap
+import os
+import struct
+import sys
+from typing import List, MutableSequence, Sequence
+
+from board import Board
+from dialogue import Dialogue
+from level import Level
+from unit import Direction, Team, Tile, TileType, Unit, UnitType
+
+MAGIC = b"WCLP"
+VERSION = 1
+PACK_SUFFIX = ".pack"
+
+HEADER = struct.Struct("<4sHI")
+INDEX_ENTRY = struct.Struct("<QI")
+NAME_LENGTH = struct.Struct("<H")
+BONUS_TROOPS = struct.Struct("<i")
+DIALOGUE_LENGTH = struct.Struct("<I")
+BOARD_SHAPE = struct.Struct("<HH")
+TILE_EXTRAS = struct.Struct("<iBii")  # Wall health, rotation, teleport destination row and column
+
+# Codes are part of the file format, so they're listed out rather than taken from the order of the enums
+TILE_TYPES: List[TileType] = [TileType.GRASS, TileType.WATER, TileType.TRAMPOLINE, TileType.WALL, TileType.DEADWALL,
+                              TileType.TRAPDOOR, TileType.FINISH_LINE, TileType.TUNNEL]
+DIRECTIONS: List[Direction] = [Direction.UP, Direction.RIGHT, Direction.DOWN, Direction.LEFT]
+TEAMS: List[Team] = [Team.ORANGE, Team.APPLE]
+TILE_TYPE_CODES = {tile_type: code for code, tile_type in enumerate(TILE_TYPES)}
+DIRECTION_CODES = {direction: code for code, direction in enumerate(DIRECTIONS)}
+TEAM_CODES = {team: code for code, team in enumerate(TEAMS)}
+
+# Tile byte: type in the low three bits, then flags
+TYPE_MASK = 0b111
+PLACEABLE = 1 << 3
+HAS_UNIT = 1 << 4
+HAS_EXTRAS = 1 << 5
+# Unit byte: direction in the low two bits, team in the next, rank above that
+
+DEFAULT_HEALTH = 5
+DEFAULT_ROTATION = Direction.RIGHT
+DEFAULT_DESTINATION = (5, 5)
+
+
+def encode_level(level: Level) -> bytes:
+    name = level.name.encode()
+    dialogue = b""
+    if level.opening_dialogue is not None:
+        dialogue = json.dumps(level.opening_dialogue.serialize(), separators=(",", ":")).encode()
+    tiles = level.board.tiles
+
+    parts = [NAME_LENGTH.pack(len(name)), name, BONUS_TROOPS.pack(level.bonus_troops),
+             DIALOGUE_LENGTH.pack(len(dialogue)), dialogue, BOARD_SHAPE.pack(len(tiles), len(tiles[0]))]
+    for row in tiles:
+        for tile in row:
+            parts.append(encode_tile(tile))
+    return b"".join(parts)
+
+
+def encode_tile(tile: Tile) -> bytes:
+    head = TILE_TYPE_CODES[tile.type]
+    if tile.is_placeable:
+        head |= PLACEABLE
+    record = bytearray(1)
+
+    if tile.unit is not None:
+        head |= HAS_UNIT
+        record.append(DIRECTION_CODES[tile.unit.direction] | TEAM_CODES[tile.unit.team] << 2 |
+                      tile.unit.type.value << 3)
+
+    destination = tuple(tile.destination)
+    if tile.health != DEFAULT_HEALTH or tile.rotation != DEFAULT_ROTATION or destination != DEFAULT_DESTINATION:
+        head |= HAS_EXTRAS
+        record += TILE_EXTRAS.pack(tile.health, DIRECTION_CODES[tile.rotation], *destination)
+
+    record[0] = head
+    return bytes(record)
+
+
+def decode_level(buffer: bytes | mmap.mmap, offset: int) -> Level:
+    (name_length,) = NAME_LENGTH.unpack_from(buffer, offset)
+    offset += NAME_LENGTH.size
+    name = buffer[offset:offset + name_length].decode()
+    offset += name_length
+    (bonus_troops,) = BONUS_TROOPS.unpack_from(buffer, offset)
+    offset += BONUS_TROOPS.size
+    (dialogue_length,) = DIALOGUE_LENGTH.unpack_from(buffer, offset)
+    offset += DIALOGUE_LENGTH.size
+    dialogue = None
+    if dialogue_length:
+        dialogue = Dialogue.from_serialized(json.loads(buffer[offset:offset + dialogue_length]))
+    offset += dialogue_length
+    height, width = BOARD_SHAPE.unpack_from(buffer, offset)
+    offset += BOARD_SHAPE.size
+
+    tiles = []
+    for _ in range(height):
+        row = []
+        for _ in range(width):
+            head = buffer[offset]
+            offset += 1
+            unit = None
+            if head & HAS_UNIT:
+                unit_byte = buffer[offset]
+                offset += 1
+                unit = Unit(UnitType(unit_byte >> 3), DIRECTIONS[unit_byte & 0b11], TEAMS[unit_byte >> 2 & 1])
+            health, rotation, destination = DEFAULT_HEALTH, DEFAULT_ROTATION, list(DEFAULT_DESTINATION)
+            if head & HAS_EXTRAS:
+                health, rotation_code, destination_row, destination_col = TILE_EXTRAS.unpack_from(buffer, offset)
+                offset += TILE_EXTRAS.size
+                rotation, destination = DIRECTIONS[rotation_code], [destination_row, destination_col]
+            # Destinations come back as lists, the same as from JSON
+            row.append(Tile(TILE_TYPES[head & TYPE_MASK], unit, bool(head & PLACEABLE), health, rotation, destination))
+        tiles.append(row)
+
+    return Level(Board(tiles), name, dialogue, bonus_troops)
+
+
+class LevelPack(MutableSequence):
+    """
+    The levels of a pack file, decoded as they're first accessed.
+    Works as a list, so levels can be replaced, inserted and removed in memory. Nothing is written until save_pack.
+    """
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.buffer = map_file(filename)
+        magic, version, count = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{filename} is not a level pack")
+        if version != VERSION:
+            raise ValueError(f"{filename} is level pack version {version}, expected {VERSION}")
+        self.levels: List[Level | int] = list(range(count))  # A level's number in the file until it's decoded
+
+    def get_record(self, level_number: int) -> bytes:
+        offset, length = INDEX_ENTRY.unpack_from(self.buffer, HEADER.size + level_number * INDEX_ENTRY.size)
+        return self.buffer[offset:offset + length]
+
+    def __getitem__(self, idx: int) -> Level:
+        level = self.levels[idx]
+        if isinstance(level, int):
+            offset, _ = INDEX_ENTRY.unpack_from(self.buffer, HEADER.size + level * INDEX_ENTRY.size)
+            level = self.levels[idx] = decode_level(self.buffer, offset)
+        return level
+
+    def __setitem__(self, idx: int, level: Level):
+        self.levels[idx] = level
+
+    def __delitem__(self, idx: int):
+        del self.levels[idx]
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def insert(self, idx: int, level: Level):
+        self.levels.insert(idx, level)
+
+    def close(self):
+        self.buffer.close()
+
+    def reopen(self):
+        self.buffer = map_file(self.filename)
+
+
+def map_file(filename: str) -> mmap.mmap:
+    with open(filename, "rb") as pack_file:
+        return mmap.mmap(pack_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def save_pack(filename: str, levels: Sequence[Level]):
+    "Levels of a LevelPack that were never decoded are copied over as they are"
+    from savedata import write_atomically
+
+    records = []
+    for idx in range(len(levels)):
+        if isinstance(levels, LevelPack) and isinstance(levels.levels[idx], int):
+            records.append(levels.get_record(levels.levels[idx]))
+        else:
+            records.append(encode_level(levels[idx]))
+
+    index = []
+    offset = HEADER.size + INDEX_ENTRY.size * len(records)
+    for record in records:
+        index.append(INDEX_ENTRY.pack(offset, len(record)))
+        offset += len(record)
+
+    # Records are copied out of the mapping above, so a pack being saved over its own file can let go of it. Windows
+    # won't replace a file that's still mapped
+    saving_over = isinstance(levels, LevelPack) and os.path.abspath(levels.filename) == os.path.abspath(filename)
+    if saving_over:
+        levels.close()
+    try:
+        write_atomically(filename, b"".join([HEADER.pack(MAGIC, VERSION, len(records)), *index, *records]))
+    finally:
+        if saving_over:
+            levels.reopen()
+    if saving_over:
+        # The levels that were never decoded are now in the file in list order
+        levels.levels = [idx if isinstance(level, int) else level for idx, level in enumerate(levels.levels)]
+
+
+def main():
+    from savedata import load_levels, save_levels
+
+    command, source, destination = sys.argv[1:4]
+    if command == "pack":
+        save_pack(destination, load_levels(source))
+    elif command == "unpack":
+        save_levels(destination, LevelPack(source))
+    else:
+        raise SystemExit(f"Unknown command {command!r}, expected pack or unpack")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""
+Campaign storage that saves only the levels that were edited.
+
+The campaign file is left as it is, and edited, inserted and deleted levels go to a journal file next to it instead: the
+campaign's level order, plus the levels that differ from the campaign file. Saving rewrites just the journal. Once the
+journal holds enough levels, or when the game closes, it's folded back into the campaign file and removed.
+
+Every file is written to a temp file and renamed over the old one, so a crash part way through a save leaves the old
+campaign or the new one, never a mix. The journal records which version of the campaign file it applies to, so a journal
+left behind by a crash after the campaign file was rewritten is ignored.
+"""
+import json
+import os
+from typing import Dict, List, MutableSequence, Tuple
+
+from level import Level
+from level_pack import LevelPack
+from savedata import load_levels, save_levels, write_atomically
+
+JOURNAL_SUFFIX = ".journal"
+
+
+def get_file_version(filename: str) -> Tuple[int, int]:
+    "Changes whenever the file is replaced"
+    stat = os.stat(filename)
+    return stat.st_size, stat.st_mtime_ns
+
+
+class LevelStore(MutableSequence):
+    def __init__(self, filename: str, compact_after: int = 16):
+        self.filename = filename
+        self.journal_filename = filename + JOURNAL_SUFFIX
+        self.compact_after = compact_after  # Journal levels that trigger folding the journal into the campaign file
+        self.base = load_levels(filename)
+        self.base_version = get_file_version(filename)
+        # Each level is a position in the campaign file, or a key into journal_levels for a level that's been edited
+        self.order: List[int | str] = list(range(len(self.base)))
+        self.journal_levels: Dict[str, Level] = {}
+        self.next_key = 0
+        self.changed = False
+
+        if os.path.exists(self.journal_filename):
+            with open(self.journal_filename, "r") as journal_file:
+                journal = json.load(journal_file)
+            if tuple(journal["Base"]) == self.base_version:
+                self.order = journal["Order"]
+                self.journal_levels = {
+                    key: Level.from_serialized(level_serial) for key, level_serial in journal["Levels"].items()
+                }
+                self.next_key = journal["Next Key"]
+
+    def __getitem__(self, idx: int) -> Level:
+        level_ref = self.order[idx]
+        if isinstance(level_ref, str):
+            return self.journal_levels[level_ref]
+        return self.base[level_ref]
+
+    def __setitem__(self, idx: int, level: Level):
+        self.order[idx] = self.add_to_journal(level)
+
+    def __delitem__(self, idx: int):
+        del self.order[idx]
+        self.changed = True
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def insert(self, idx: int, level: Level):
+        self.order.insert(idx, self.add_to_journal(level))
+
+    def add_to_journal(self, level: Level) -> str:
+        key = str(self.next_key)
+        self.next_key += 1
+        self.journal_levels[key] = level
+        self.changed = True
+        return key
+
+    def save(self):
+        "Writes the journal, or folds it into the campaign file once it holds compact_after levels"
+        if not self.changed:
+            return
+        journal_keys = [level_ref for level_ref in self.order if isinstance(level_ref, str)]
+        if len(journal_keys) >= self.compact_after:
+            self.compact()
+            return
+
+        # Levels that were replaced again or deleted since the last save are dropped
+        self.journal_levels = {key: self.journal_levels[key] for key in journal_keys}
+        journal = {
+            "Base": self.base_version,
+            "Order": self.order,
+            "Levels": {key: level.serialize() for key, level in self.journal_levels.items()},
+            "Next Key": self.next_key,
+        }
+        write_atomically(self.journal_filename, json.dumps(journal).encode())
+        self.changed = False
+
+    def compact(self):
+        "Rewrites the campaign file with every level in order, and removes the journal"
+        if not self.changed and not os.path.exists(self.journal_filename):
+            return
+        levels = list(self)
+        if isinstance(self.base, LevelPack):
+            self.base.close()  # Every level is decoded now, and Windows won't replace a file that's still mapped
+        save_levels(self.filename, levels)
+        if os.path.exists(self.journal_filename):
+            os.remove(self.journal_filename)
+
+        self.base = levels
+        self.base_version = get_file_version(self.filename)
+        self.order = list(range(len(levels)))
+        self.journal_levels = {}
+        self.changed = False
@@ -1,23 +1,28 @@
 import os
 from copy import deepcopy
 from json import JSONEncoder
-from typing import List
+from typing import List, Dict, Tuple
 
 import pygame
 from pygame import MOUSEBUTTONDOWN, Surface, MOUSEBUTTONUP
 
 import constants
-from board import Unit, Direction, Team, UnitType
+from board import Board, Unit, Direction, Team, UnitType
+from board_renderer import record_animation
 from constants import SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE, GENERATE_FILE, LOAD_FILE, ENABLE_EDITING
 from gamemode import GameMode
 from gamestate import GameState
 from level import Level, level_data
+from level_store import LevelStore
 from mode_screens.dialogue_mode import get_dialogue_screen
 from mode_screens.edit_mode import get_edit_screen
 from mode_screens.result_mode import get_results_screen
-from savedata import save_levels, load_levels, save_user_state, load_user_state
-from tile_images import PLAY_IMAGE, ORANGE_BG
+from replay import ReplayRecorder
+from savedata import save_levels, save_user_state, load_user_state
+from scheduler import Scheduler
+import tile_images
 from title import render_title_screen
+from unit import load_unit_images
 from ui import ImageButton, TextButton
 
 pygame.init()
@@ -26,7 +31,11 @@ pygame.init()
 screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
 
 pygame.display.set_caption("Warchard")
-play_button = ImageButton(SCREEN_WIDTH - 64, SCREEN_HEIGHT - 64, 64, 64, PLAY_IMAGE)
+Board.event_subscribers.append(record_animation)
+load_unit_images()
+play_button = ImageButton(SCREEN_WIDTH - 64, SCREEN_HEIGHT - 64, 64, 64, tile_images.PLAY_IMAGE)
+
+MAX_FRAME_SECONDS = 0.25
 
 def main():
     levels: List[Level] = []
@@ -53,7 +62,7 @@ def main():
         save_levels("levels_converted_1.json", level_data)
 
     if LOAD_FILE:
-        levels = load_levels(data_file)
+        levels = LevelStore(data_file)
         if os.path.exists("save.json"):
             save = load_user_state("save.json")
             level_idx = save["Level"]
@@ -68,27 +77,57 @@ def main():
     type_to_level_name = False
     input_string = ""
 
+    # Input and board updates can change anything on screen, so the frame after one is always drawn in full
+    redraw = True
+    last_background_offset = None
+
+    scheduler = Scheduler()
+    frame_seconds = 0
+    recorder = ReplayRecorder()
+
     while running:
         game_state.frame_count += 1
+        if game_state.game_mode != GameMode.PLAY_TROOPS:
+            game_state.animation_frame = game_state.frame_count
 
-        render_checkerboard_background(screen, game_state.frame_count)
+        if game_state.game_mode not in (GameMode.TITLE_SCREEN, GameMode.RESULTS_SCREEN, GameMode.DIALOGUE):
+            game_state.placed_units = game_state.board.get_number_of_units_by_team(Team.ORANGE)
 
-        if game_state.game_mode == GameMode.TITLE_SCREEN:
-            render_title_screen(screen, constants.title_font, start_button)
-        elif game_state.game_mode == GameMode.RESULTS_SCREEN:
-            results_screen.draw(screen, game_state,levels,level_idx)
+        # The background covers the whole screen, so a frame where it scrolls is drawn in full
+        background_offset = get_background_offset(game_state.frame_count)
+        if redraw or background_offset != last_background_offset:
+            dirty_rects = [screen.get_rect()]
         elif game_state.game_mode == GameMode.DIALOGUE:
-            dialogue_screen.draw(screen, game_state)
-        elif game_state.game_mode == GameMode.EDIT_LEVEL:
-            game_state.placed_units = game_state.board.get_number_of_units_by_team(Team.ORANGE)
-            edit_screen.draw(screen, game_state)
+            dirty_rects = dialogue_screen.get_dirty_rects(game_state)
+        elif game_state.game_mode in (GameMode.TITLE_SCREEN, GameMode.RESULTS_SCREEN):
+            dirty_rects = []
         else:
-            game_state.placed_units = game_state.board.get_number_of_units_by_team(Team.ORANGE)
-            edit_screen.common_draw(screen, game_state)
+            dirty_rects = edit_screen.get_dirty_rects(game_state)
+        redraw = False
+        last_background_offset = background_offset
+
+        if len(dirty_rects) > 0:
+            # Everything is drawn as usual, but only what lands in the dirty area touches the screen
+            screen.set_clip(dirty_rects[0].unionall(dirty_rects[1:]))
+            render_checkerboard_background(screen, game_state.frame_count)
+
+            if game_state.game_mode == GameMode.TITLE_SCREEN:
+                render_title_screen(screen, constants.title_font, start_button)
+            elif game_state.game_mode == GameMode.RESULTS_SCREEN:
+                results_screen.draw(screen, game_state,levels,level_idx)
+            elif game_state.game_mode == GameMode.DIALOGUE:
+                dialogue_screen.draw(screen, game_state)
+            elif game_state.game_mode == GameMode.EDIT_LEVEL:
+                edit_screen.draw(screen, game_state)
+            else:
+                edit_screen.common_draw(screen, game_state)
 
-        pygame.display.flip()
+            screen.set_clip(None)
+            pygame.display.update(dirty_rects)
 
         for event in pygame.event.get():
+            if event.type != pygame.MOUSEMOTION or edit_screen.drag:
+                redraw = True
             if event.type == pygame.QUIT:
                 running = False
             elif typing:
@@ -105,7 +144,9 @@ def main():
                 if event.type == pygame.KEYDOWN:
                     pos = None
                     key = event.key
-                    if event.key == pygame.K_MINUS and ENABLE_EDITING:
+                    if event.key == pygame.K_f:
+                        game_state.speed = game_state.speed.next()
+                    elif event.key == pygame.K_MINUS and ENABLE_EDITING:
                         game_state.max_units -= 1
                     elif event.key == pygame.K_EQUALS and ENABLE_EDITING:
                         game_state.max_units += 1
@@ -115,17 +156,12 @@ def main():
                             game_state.board.animations = []
                             game_state.board.update_strength_defense(game_state.frame_count)
                         elif game_state.game_mode == GameMode.EDIT_TROOPS and ENABLE_EDITING:
+                            recorder.finish()
                             game_state.game_mode = GameMode.EDIT_LEVEL
                         elif game_state.game_mode == GameMode.EDIT_LEVEL:
-                            if len(edit_screen.board_history) > 0:
-                                game_state.board = edit_screen.board_history[0]
-                                levels[level_idx] = game_state.data_to_level()
-                                save_levels(data_file, levels)
-                                edit_screen.history_index = 0
-                                edit_screen.board_history = []
-                            else:
-                                levels[level_idx] = game_state.data_to_level()
-                                save_levels(data_file, levels)
+                            edit_screen.history.reset(game_state.board)
+                            levels[level_idx] = game_state.data_to_level()
+                            levels.save()
                             game_state.game_mode = GameMode.EDIT_TROOPS
                     elif key == pygame.K_RETURN:
                         if game_state.game_mode == GameMode.EDIT_LEVEL:
@@ -184,6 +220,7 @@ def main():
                             else:
                                 game_state.game_mode = GameMode.DIALOGUE
                     elif game_state.game_mode == GameMode.EDIT_TROOPS:
+                        recorder.start(level_idx, game_state.level_name, game_state.board)
                         # Calculate row and column from click position
                         col = (pos[0] - ((SCREEN_WIDTH - len(game_state.board.tiles[0]) * TILE_SIZE) // 2)) // TILE_SIZE
                         row = (pos[1] - ((SCREEN_HEIGHT - len(game_state.board.tiles) * TILE_SIZE) // 2)) // TILE_SIZE
@@ -196,8 +233,11 @@ def main():
                             if tile.unit is None:
                                 if game_state.placed_units < game_state.max_units - game_state.board.units_killed_by_team[Team.ORANGE] and tile.is_free() and tile.is_placeable:
                                     tile.unit = Unit(UnitType.SOLDIER, Direction.RIGHT, Team.ORANGE)
+                                    recorder.record_placement(row, col)
                             elif tile.unit.team is Team.ORANGE:
                                 tile.unit = None
+                                recorder.record_placement(row, col)
+                            game_state.board.mark_dirty(row, col)
 
                         game_state.board.animations = []
                         game_state.board.update_strength_defense(game_state.frame_count)
@@ -205,6 +245,7 @@ def main():
                         # Check if play button was clicked
                         if play_button.check_click(pos):
                             game_state.board.set_initial_animations(game_state.frame_count)
+                            scheduler.start(game_state.frame_count)
                             game_state.game_mode = GameMode.PLAY_TROOPS
                 elif event.type == pygame.MOUSEMOTION and edit_screen.drag:
                     pos = pygame.mouse.get_pos()
@@ -219,37 +260,65 @@ def main():
                         game_state.board.update_strength_defense(game_state.frame_count)
         if type_to_level_name:
             game_state.level_name = input_string
-        # Update board during PLAY_TROOPS phase
+        # Update board during PLAY_TROOPS phase, on the scheduler's clock rather than once every so many drawn frames
         if game_state.game_mode == GameMode.PLAY_TROOPS:
-            if game_state.frame_count % 15 == 0:
-                update_change = game_state.board.update(game_state.frame_count)
+            for update_change in scheduler.advance(game_state.board, frame_seconds, game_state.speed):
+                redraw = True
+                recorder.record_tick(game_state.board)
 
                 if not update_change:
                     game_state.troops_killed = game_state.board.units_killed_by_team[Team.ORANGE]
                     game_state.game_mode = GameMode.RESULTS_SCREEN
+                    recorder.finish()
+                    break
 
                 elif game_state.board.updates % 10 == 0:
                     game_state.game_mode = GameMode.EDIT_TROOPS
                     game_state.board.animations = []
                     game_state.board.update_strength_defense(game_state.frame_count)
+                    break
+            game_state.animation_frame = scheduler.frame
 
-        clock.tick(50)
+        # Long stalls (dragging the window, say) are dropped instead of being played back all at once
+        frame_seconds = min(clock.tick(50) / 1000, MAX_FRAME_SECONDS)
 
+    recorder.finish()
+    if LOAD_FILE:
+        levels.compact()
     pygame.quit()
 
-def render_checkerboard_background(screen: Surface, frame_count: int):
-    screen.fill((201, 221, 255))
+# Backgrounds by screen size. Each is a screen of the pattern plus one period on each axis, so any scroll offset is a
+# single blit.
+checkerboard_backgrounds: Dict[Tuple[int, int], Surface] = {}
 
-    tile_image = ORANGE_BG
 
-    # Get the screen dimensions and the tile size
-    screen_width, screen_height = screen.get_size()
-    tile_width, tile_height = tile_image.get_size()
+def get_checkerboard_background(screen_width: int, screen_height: int) -> Surface:
+    background = checkerboard_backgrounds.get((screen_width, screen_height))
+    if background is None:
+        tile_image = tile_images.ORANGE_BG
+        tile_width, tile_height = tile_image.get_size()
+        period_width, period_height = 4*tile_width, 4*tile_height
+
+        background = Surface((screen_width + period_width, screen_height + period_height))
+        background.fill((201, 221, 255))
+        for y in range(-screen_height//2 - period_height, screen_height, tile_height):
+            for x in range(-screen_width//2 - period_width, screen_width, tile_width):
+                if ((x // tile_width) % 4 == 0 and y // tile_width % 4 == 0) or ((x // tile_width) % 4 == 2 and y // tile_width % 4 == 2):
+                    background.blit(tile_image, (x + period_width, y + period_height))
+        checkerboard_backgrounds[(screen_width, screen_height)] = background
+    return background
+
+
+def get_background_offset(frame_count: int) -> int:
     anim_length = 4*32*2
-    for y in range(-screen_height//2, screen_height, tile_height):
-        for x in range(-screen_width//2, screen_width, tile_width):
-            if ((x // tile_width) % 4 == 0 and y // tile_width % 4 == 0) or ((x // tile_width) % 4 == 2 and y // tile_width % 4 == 2):
-                screen.blit(tile_image, (x+(frame_count % anim_length)/2, y+(frame_count % anim_length)/2))
+    return (frame_count % anim_length) // 2
+
+
+def render_checkerboard_background(screen: Surface, frame_count: int):
+    screen_width, screen_height = screen.get_size()
+    tile_width, tile_height = tile_images.ORANGE_BG.get_size()
+    offset = get_background_offset(frame_count)
+    screen.blit(get_checkerboard_background(screen_width, screen_height), (offset - 4*tile_width, offset - 4*tile_height))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
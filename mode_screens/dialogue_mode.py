@@ -1,10 +1,12 @@
-from typing import Tuple
+from typing import Tuple, List
 
 import pygame
 from pygame import Surface
 
 import constants
+from board_renderer import render_board, get_board_rect, is_board_animated
 from constants import SCREEN_WIDTH, SCREEN_HEIGHT
+from dialogue import get_dialogue_box_rect
 from gamestate import GameState
 from ui import GameScreen
 
@@ -14,13 +16,23 @@ class DialogueScreen(GameScreen):
         pass
 
     def draw(self, screen: Surface, game_state: GameState):
-        game_state.board.render(screen, game_state.game_mode, game_state.frame_count)
+        render_board(game_state.board, screen, game_state.game_mode, game_state.frame_count)
         overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 100))
         screen.blit(overlay, (0, 0))
         if game_state.current_dialogue is not None:
             game_state.current_dialogue.render(screen, constants.big_font, game_state.frame_count)
 
+    def get_dirty_rects(self, game_state: GameState) -> List[pygame.Rect]:
+        dirty_rects = []
+        if is_board_animated(game_state.board):
+            dirty_rects.append(get_board_rect(game_state.board))
+        # The last character is typed on the first frame the dialogue counts as complete
+        if game_state.current_dialogue is not None and \
+                not game_state.current_dialogue.is_complete(game_state.frame_count - 1):
+            dirty_rects.append(get_dialogue_box_rect())
+        return dirty_rects
+
     def run(self, pos, event, game_state: GameState):
         if game_state.current_dialogue is not None:
             if pos:
@@ -1,27 +1,26 @@
-from copy import deepcopy
 from typing import Optional, Tuple, List
 
 import pygame
 from pygame import Surface
 
 import constants
-from board import Board
+from board_history import BoardHistory
+from board_renderer import render_board, get_board_rect, is_board_animated
 from constants import SCREEN_WIDTH, TILE_SIZE, SCREEN_HEIGHT
 from gamestate import GameState
-from tile_images import ORANGE_IMAGE, ROTATE_CCW_IMAGE, ROTATE_CW_IMAGE, APPLE_IMAGE, GRASS_IMAGE, WATER_IMAGE, \
-    TRAMPOLINE_SLASH, GRAVESTONE_IMAGE, BROKEN_GRAVESTONE_IMAGE, LAVA_IMAGE, FINISH_LINE_IMAGE, PLAY_IMAGE
-from ui import RadioButtons, GameScreen, HorizontalRadioSelector, RadioMeta, ImageButton
+from scheduler import Speed
+import tile_images
+from ui import RadioButtons, GameScreen, HorizontalRadioSelector, RadioMeta, ImageButton, render_text
 from unit import TileType, Team, UnitType, Direction, Unit, Tile
 
 
 class EditScreen(GameScreen):
-    def __init__(self, item_selector: RadioButtons, play_button: ImageButton, board_history: List[Board] = None):
+    def __init__(self, item_selector: RadioButtons, play_button: ImageButton, history: BoardHistory = None):
         self.item_selector = item_selector
         self.backup_tile: Optional[Tile] = None
         self.play_button = play_button
-        self.reset = ImageButton(SCREEN_WIDTH - 134, SCREEN_HEIGHT - 64, 64, 64, pygame.transform.flip(ROTATE_CW_IMAGE,True, False))
-        self.board_history = board_history
-        self.history_index: int = 0
+        self.reset = ImageButton(SCREEN_WIDTH - 134, SCREEN_HEIGHT - 64, 64, 64, pygame.transform.flip(tile_images.ROTATE_CW_IMAGE,True, False))
+        self.history = history
         self.drag = False
         self.reset.rect.move(SCREEN_WIDTH - 70, SCREEN_HEIGHT // 2)
 
@@ -38,36 +37,25 @@ class EditScreen(GameScreen):
             key = event.key
             self.item_selector.run(None, key)
             if key == pygame.K_r:
-                if len(self.board_history) > 0:
-                    game_state.board = self.board_history[0]
-                    self.board_history = []
-                    self.history_index = 0
+                self.history.reset(game_state.board)
+                game_state.board.update_strength_defense(game_state.frame_count)
             elif key == pygame.K_COMMA:
-                if len(self.board_history) > 0 and self.history_index > 0:
-                    game_state.board = self.board_history[self.history_index - 1]
-                    self.history_index -= 1
+                self.history.step_back(game_state.board)
+                game_state.board.update_strength_defense(game_state.frame_count)
             elif key == pygame.K_u:
-                game_state.board.add_row()
+                self.history.add_row(game_state.board)
             elif key == pygame.K_i:
-                game_state.board.add_col()
+                self.history.add_col(game_state.board)
             elif key == pygame.K_j:
-                game_state.board.del_row()
+                self.history.del_row(game_state.board)
             elif key == pygame.K_k:
-                game_state.board.del_col()
+                self.history.del_col(game_state.board)
         elif event.type == pygame.MOUSEBUTTONDOWN:
             self.item_selector.run(pos, None)
             if self.reset.check_click(pos):
-                if len(self.board_history) > 0:
-                    game_state.board = self.board_history[0]
-                    self.board_history = []
-                    self.history_index = 0
+                self.history.reset(game_state.board)
             elif self.play_button.check_click(pos):
-                if self.history_index < len(self.board_history):
-                    self.history_index = len(self.board_history)
-                    game_state.board = self.board_history[self.history_index - 1]
-                self.board_history.append(deepcopy(game_state.board))
-                game_state.board.update(game_state.frame_count)
-                self.history_index += 1
+                self.history.step(game_state.board, game_state.frame_count)
             # Calculate row and column from click position
             col = (pos[0] - ((SCREEN_WIDTH - len(game_state.board.tiles[0]) * TILE_SIZE) // 2)) // TILE_SIZE
             row = (pos[1] - ((SCREEN_HEIGHT - len(game_state.board.tiles) * TILE_SIZE) // 2)) // TILE_SIZE
@@ -78,6 +66,9 @@ class EditScreen(GameScreen):
             elif 0 <= row < len(game_state.board.tiles) and 0 <= col < len(
                     game_state.board.tiles[0]) and not self.drag:
                 tile = game_state.board.tiles[row][col]
+                game_state.board.mark_dirty(row, col)
+                game_state.board.mark_terrain_dirty(row, col)
+                self.history.edit(game_state.board, row, col)
                 # Add or remove units based on current state
                 match self.item_selector.selected_item:
                     case "apple":
@@ -142,18 +133,23 @@ class EditScreen(GameScreen):
             row = (pos[1] - ((SCREEN_HEIGHT - len(game_state.board.tiles) * TILE_SIZE) / 2)) / TILE_SIZE
             print("Click Pos: " + str(col) + ", " + str(row))
             if row-0.25 > len(game_state.board.tiles):
-                game_state.board.add_row()
+                self.history.add_row(game_state.board)
             elif row+0.25 < len(game_state.board.tiles):
-                game_state.board.del_row()
+                self.history.del_row(game_state.board)
             if col-0.25 > len(game_state.board.tiles[0]):
-                game_state.board.add_col()
+                self.history.add_col(game_state.board)
             elif col+0.25 < len(game_state.board.tiles[0]):
-                game_state.board.del_col()
+                self.history.del_col(game_state.board)
+
+    def get_dirty_rects(self, game_state: GameState) -> List[pygame.Rect]:
+        if is_board_animated(game_state.board):
+            return [get_board_rect(game_state.board)]
+        return []
 
     def common_draw(self, screen: Surface, game_state: GameState, dark: bool = False):
         big_font = constants.big_font
-        game_state.board.render(screen, game_state.game_mode, game_state.frame_count, dark)
-        level_name_surface = big_font.render(game_state.level_name, True, (0, 0, 0))
+        render_board(game_state.board, screen, game_state.game_mode, game_state.animation_frame, dark)
+        level_name_surface = render_text(big_font, game_state.level_name, True, (0, 0, 0))
         l_name_rect = level_name_surface.get_rect(
             topleft=(
                 (SCREEN_WIDTH - 14 * len(game_state.level_name)) // 2,
@@ -165,17 +161,23 @@ class EditScreen(GameScreen):
         self.play_button.draw(screen)
 
         counter_text = f"Units: {game_state.placed_units}/{game_state.max_units - game_state.board.units_killed_by_team[Team.ORANGE]}"
-        counter_surface = big_font.render(counter_text, True, (0, 0, 0))
+        counter_surface = render_text(big_font, counter_text, True, (0, 0, 0))
         counter_rect = counter_surface.get_rect(topleft=(20, 20))
         pygame.draw.rect(screen, (255, 255, 255), counter_rect.inflate(20, 10))
         screen.blit(counter_surface, counter_rect)
 
+        if game_state.speed != Speed.NORMAL:
+            speed_surface = render_text(big_font, game_state.speed.value.label, True, (0, 0, 0))
+            speed_rect = speed_surface.get_rect(topright=(SCREEN_WIDTH - 20, 20))
+            pygame.draw.rect(screen, (255, 255, 255), speed_rect.inflate(20, 10))
+            screen.blit(speed_surface, speed_rect)
+
         # Display finished units by team
-        orange_finished_surface = big_font.render(
-            f"{game_state.board.finished_units_by_team[Team.ORANGE]}", True, (0, 0, 0)
+        orange_finished_surface = render_text(
+            big_font, f"{game_state.board.finished_units_by_team[Team.ORANGE]}", True, (0, 0, 0)
         )
-        apple_finished_surface = big_font.render(
-            f"{game_state.board.finished_units_by_team[Team.APPLE]}", True, (0, 0, 0)
+        apple_finished_surface = render_text(
+            big_font, f"{game_state.board.finished_units_by_team[Team.APPLE]}", True, (0, 0, 0)
         )
 
         # Calculate Y-position for team counters
@@ -199,8 +201,8 @@ def get_edit_screen(play_button):
         [
             HorizontalRadioSelector(
                 [
-                    HorizontalRadioSelector.RadioItem(ROTATE_CCW_IMAGE, "rotate ccw", None),
-                    HorizontalRadioSelector.RadioItem(ROTATE_CW_IMAGE, "rotate cw", None)
+                    HorizontalRadioSelector.RadioItem(tile_images.ROTATE_CCW_IMAGE, "rotate ccw", None),
+                    HorizontalRadioSelector.RadioItem(tile_images.ROTATE_CW_IMAGE, "rotate cw", None)
                 ],
                 6,
                 SCREEN_HEIGHT - 76,
@@ -208,17 +210,17 @@ def get_edit_screen(play_button):
             ),
             HorizontalRadioSelector(
                 [
-                    HorizontalRadioSelector.RadioItem(GRASS_IMAGE,"placable", pygame.K_p),
-                    HorizontalRadioSelector.RadioItem(ORANGE_IMAGE, "orange", pygame.K_1),
-                    HorizontalRadioSelector.RadioItem(APPLE_IMAGE, "apple", pygame.K_2),
-                    HorizontalRadioSelector.RadioItem(GRASS_IMAGE, "grass", pygame.K_3),
-                    HorizontalRadioSelector.RadioItem(WATER_IMAGE, "water", pygame.K_4),
-                    HorizontalRadioSelector.RadioItem(TRAMPOLINE_SLASH, "trampoline", pygame.K_5),
-                    HorizontalRadioSelector.RadioItem(GRAVESTONE_IMAGE, "wall", pygame.K_6),
-                    HorizontalRadioSelector.RadioItem(BROKEN_GRAVESTONE_IMAGE, "remains", pygame.K_7),
-                    HorizontalRadioSelector.RadioItem(LAVA_IMAGE, "lava", pygame.K_8),
-                    HorizontalRadioSelector.RadioItem(FINISH_LINE_IMAGE, "finish line", pygame.K_9),
-                    HorizontalRadioSelector.RadioItem(BROKEN_GRAVESTONE_IMAGE, "teleporter", pygame.K_0),
+                    HorizontalRadioSelector.RadioItem(tile_images.GRASS_IMAGE,"placable", pygame.K_p),
+                    HorizontalRadioSelector.RadioItem(tile_images.ORANGE_IMAGE, "orange", pygame.K_1),
+                    HorizontalRadioSelector.RadioItem(tile_images.APPLE_IMAGE, "apple", pygame.K_2),
+                    HorizontalRadioSelector.RadioItem(tile_images.GRASS_IMAGE, "grass", pygame.K_3),
+                    HorizontalRadioSelector.RadioItem(tile_images.WATER_IMAGE, "water", pygame.K_4),
+                    HorizontalRadioSelector.RadioItem(tile_images.TRAMPOLINE_SLASH, "trampoline", pygame.K_5),
+                    HorizontalRadioSelector.RadioItem(tile_images.GRAVESTONE_IMAGE, "wall", pygame.K_6),
+                    HorizontalRadioSelector.RadioItem(tile_images.BROKEN_GRAVESTONE_IMAGE, "remains", pygame.K_7),
+                    HorizontalRadioSelector.RadioItem(tile_images.LAVA_IMAGE, "lava", pygame.K_8),
+                    HorizontalRadioSelector.RadioItem(tile_images.FINISH_LINE_IMAGE, "finish line", pygame.K_9),
+                    HorizontalRadioSelector.RadioItem(tile_images.BROKEN_GRAVESTONE_IMAGE, "teleporter", pygame.K_0),
                 ],
                 SCREEN_WIDTH - 770,
                 6,
@@ -227,4 +229,4 @@ def get_edit_screen(play_button):
         ]
     )
 
-    return EditScreen(god_mode_editor, play_button, [])
\ No newline at end of file
+    return EditScreen(god_mode_editor, play_button, BoardHistory())
\ No newline at end of file
@@ -8,7 +8,7 @@ from board import Board
 from constants import SCREEN_WIDTH, SCREEN_HEIGHT
 from gamestate import GameState
 from level import Level
-from ui import GameScreen, TextButton
+from ui import GameScreen, TextButton, render_text
 from unit import Team
 
 class ResultsScreen(GameScreen):
@@ -27,7 +27,7 @@ class ResultsScreen(GameScreen):
 
         result_text = "SUCCESS!" if success else "FAILURE!"
         result_color = (106, 190, 48) if success else (172, 50, 50)
-        result_surface = title_font.render(result_text, False, result_color)
+        result_surface = render_text(title_font, result_text, False, result_color)
         result_rect = result_surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 4))
         screen.blit(result_surface, result_rect)
 
@@ -45,7 +45,7 @@ class ResultsScreen(GameScreen):
 
         for i, text in enumerate(lines):
             if text:  # Only render non-empty lines
-                line_surface = big_font.render(text, False, (0, 0, 0))
+                line_surface = render_text(big_font, text, False, (0, 0, 0))
                 line_rect = line_surface.get_rect(center=(SCREEN_WIDTH // 2, y_offset + i * line_spacing))
                 screen.blit(line_surface, line_rect)
 
@@ -0,0 +1,196 @@
+"""
+Replays of attempts at a level.
+
+A replay holds the level, a hash of its board when the attempt started, and one phase per press of the play button:
+the squares where ORANGE soldiers were placed or removed beforehand, then the board's state hash after every update
+until play paused or ended. Playing one back loads the level, makes the same placements, runs the updates with
+nothing in between, and checks every hash, so a rule change that alters an attempt is caught at the tick it diverges.
+
+    python replay.py REPLAY_OR_FOLDER... [--levels FILE] [--render]
+"""
+import argparse
+import json
+import os
+from copy import deepcopy
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from board import Board
+from unit import Direction, Team, Unit, UnitType
+from zobrist import board_hash
+
+REPLAY_FOLDER = "replays"
+
+Square = Tuple[int, int]
+
+
+@dataclass
+class ReplayPhase:
+    placements: List[Square] = field(default_factory=list)  # Squares toggled between an ORANGE soldier and empty
+    tick_hashes: List[int] = field(default_factory=list)  # Board.state_hash after each update
+
+
+@dataclass
+class Replay:
+    level_idx: int
+    level_name: str
+    start_hash: int
+    phases: List[ReplayPhase] = field(default_factory=list)
+
+    def serialize(self) -> dict:
+        return {"Level": self.level_idx, "Level Name": self.level_name, "Start Hash": self.start_hash,
+                "Phases": [{"Placements": phase.placements, "Tick Hashes": phase.tick_hashes} for phase in self.phases]}
+
+    @classmethod
+    def from_serialized(cls, serialized_data: dict) -> "Replay":
+        phases = [ReplayPhase([tuple(square) for square in phase["Placements"]], phase["Tick Hashes"])
+                  for phase in serialized_data["Phases"]]
+        return Replay(serialized_data["Level"], serialized_data["Level Name"], serialized_data["Start Hash"], phases)
+
+
+def toggle_orange(board: Board, row_idx: int, col_idx: int):
+    "What a click on the board does in EDIT_TROOPS, once the game has decided the click goes through"
+    tile = board.tiles[row_idx][col_idx]
+    if tile.unit is None:
+        tile.unit = Unit(UnitType.SOLDIER, Direction.RIGHT, Team.ORANGE)
+    else:
+        tile.unit = None
+    board.mark_dirty(row_idx, col_idx)
+
+
+class ReplayRecorder:
+    "Follows one attempt at a time through the game loop, and writes it out when the attempt ends"
+
+    def __init__(self, folder: str = REPLAY_FOLDER):
+        self.folder = folder
+        self.replay: Optional[Replay] = None
+
+    def start(self, level_idx: int, level_name: str, board: Board):
+        "Starts recording, unless an attempt is already being recorded"
+        if self.replay is None:
+            self.replay = Replay(level_idx, level_name, board_hash(board.tiles))
+
+    def record_placement(self, row_idx: int, col_idx: int):
+        if not self.replay.phases or self.replay.phases[-1].tick_hashes:
+            self.replay.phases.append(ReplayPhase())
+        self.replay.phases[-1].placements.append((row_idx, col_idx))
+
+    def record_tick(self, board: Board):
+        if self.replay is None:
+            return
+        if not self.replay.phases:
+            self.replay.phases.append(ReplayPhase())
+        self.replay.phases[-1].tick_hashes.append(board.state_hash)
+
+    def finish(self) -> Optional[str]:
+        "Writes the attempt out if the board was ever updated, and returns the file it went to"
+        replay, self.replay = self.replay, None
+        if replay is None or not any(phase.tick_hashes for phase in replay.phases):
+            return None
+        from savedata import write_atomically
+
+        os.makedirs(self.folder, exist_ok=True)
+        filename = os.path.join(self.folder, f"level{replay.level_idx + 1}_{datetime.now():%Y%m%d_%H%M%S_%f}.json")
+        write_atomically(filename, json.dumps(replay.serialize()).encode())
+        return filename
+
+
+class PlaybackResult(NamedTuple):
+    ticks: int  # Updates that ran, up to and including the first mismatch
+    mismatch_tick: Optional[int]  # The first update whose hash differs from the recording, or None if all matched
+    start_matches: bool  # Whether the level's board is the one the attempt started from
+    kills_by_team: dict
+    finished_by_team: dict
+
+
+def play_back(replay: Replay, board: Board, on_tick: Optional[Callable[[Board, int], None]] = None,
+              frames_per_update: int = 15) -> PlaybackResult:
+    """
+    Plays the replay on board, which is changed in place. on_tick, if given, is called after each update with the board
+    and the frame the update was timed at, spacing updates out the way the game's scheduler does at normal speed.
+    """
+    start_matches = board_hash(board.tiles) == replay.start_hash
+    mismatch_tick = None
+    for phase in replay.phases:
+        for row_idx, col_idx in phase.placements:
+            toggle_orange(board, row_idx, col_idx)
+        board.update_strength_defense(board.updates)
+        for expected_hash in phase.tick_hashes:
+            frame = (board.updates + 1) * frames_per_update
+            board.update(frame)
+            if on_tick is not None:
+                on_tick(board, frame)
+            if board.state_hash != expected_hash:
+                mismatch_tick = board.updates
+                break
+        if mismatch_tick is not None:
+            break
+    return PlaybackResult(board.updates, mismatch_tick, start_matches, dict(board.units_killed_by_team),
+                          dict(board.finished_units_by_team))
+
+
+def get_tick_renderer(frames_per_update: int = 15):
+    "Draws every frame of each update's animations to a window, as fast as they can be drawn"
+    import pygame
+
+    from board_renderer import record_animation, render_board
+    from gamemode import GameMode
+
+    pygame.init()
+    screen = pygame.display.set_mode((1200, 800))
+    if record_animation not in Board.event_subscribers:
+        Board.event_subscribers.append(record_animation)
+
+    def render_tick(board: Board, update_frame: int):
+        pygame.event.pump()
+        for frame in range(update_frame, update_frame + frames_per_update):
+            screen.fill((201, 221, 255))
+            render_board(board, screen, GameMode.PLAY_TROOPS, frame)
+            pygame.display.flip()
+
+    return render_tick
+
+
+def find_replays(paths: List[str]) -> List[str]:
+    filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            filenames += sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".json"))
+        else:
+            filenames.append(path)
+    return filenames
+
+
+def main():
+    from savedata import load_levels
+
+    parser = argparse.ArgumentParser(description="Play recorded attempts back and check them tick by tick")
+    parser.add_argument("replays", nargs="*", default=[REPLAY_FOLDER])
+    parser.add_argument("--levels", default="new_levels.json")
+    parser.add_argument("--render", action="store_true", help="Draw the board while it plays")
+    args = parser.parse_args()
+
+    levels = load_levels(args.levels)
+    on_tick = get_tick_renderer() if args.render else None
+    failures = 0
+    for filename in find_replays(args.replays):
+        with open(filename, "r") as replay_file:
+            replay = Replay.from_serialized(json.load(replay_file))
+        if replay.level_idx >= len(levels):
+            print(f"{filename}: level {replay.level_idx + 1} isn't in {args.levels}")
+            failures += 1
+            continue
+
+        result = play_back(replay, deepcopy(levels[replay.level_idx].board), on_tick)
+        warning = "" if result.start_matches else " (the level has changed since this was recorded)"
+        if result.mismatch_tick is None:
+            print(f"{filename}: OK, {result.ticks} ticks{warning}")
+        else:
+            print(f"{filename}: DIVERGES at tick {result.mismatch_tick}{warning}")
+            failures += 1
+    raise SystemExit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
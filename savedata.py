@@ -1,10 +1,15 @@
 import json
+import os
 from typing import Dict
 
 from level import Level
+from level_pack import PACK_SUFFIX, LevelPack, save_pack
 
 
 def load_levels(filename: str) -> list:
+    "Loads a JSON level file, or a level pack, which decodes each level on first access"
+    if filename.endswith(PACK_SUFFIX):
+        return LevelPack(filename)
     levels = []
     with open(filename, 'r') as json_file:
         levels_serialized = json.load(json_file)
@@ -13,18 +18,26 @@ def load_levels(filename: str) -> list:
     return levels
 
 def save_levels(filename: str, levels: list) -> None:
+    if filename.endswith(PACK_SUFFIX):
+        save_pack(filename, levels)
+        return
     mega_dict = {}
     for level_id, level in enumerate(levels):
-        mega_dict["Level " + str(level_id + 1)] = level
+        mega_dict["Level " + str(level_id + 1)] = level.serialize()
 
-    json_data = json.dumps(mega_dict)
-    with open(filename, "w") as json_file:
-        json_file.write(json_data)
+    write_atomically(filename, json.dumps(mega_dict).encode())
 
 def save_user_state(filename: str, data: Dict[str, int]) -> None:
-    json_data = json.dumps(data)
-    with open(filename, "w") as json_file:
-        json_file.write(json_data)
+    write_atomically(filename, json.dumps(data).encode())
+
+def write_atomically(filename: str, data: bytes) -> None:
+    "Writes to a temp file that then replaces filename, so a crash leaves either the old file or the new one"
+    temp_filename = filename + ".tmp"
+    with open(temp_filename, "wb") as temp_file:
+        temp_file.write(data)
+        temp_file.flush()
+        os.fsync(temp_file.fileno())
+    os.replace(temp_filename, filename)
 
 def load_user_state(filename: str) -> Dict[str, int]:
     with open(filename, 'r') as json_file:
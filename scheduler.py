@@ -0,0 +1,56 @@
+from enum import Enum
+from typing import Iterator, NamedTuple, Optional, Self
+
+from board import Board
+
+
+class SpeedData(NamedTuple):
+    multiplier: Optional[int]  # None runs updates back to back with no time in between
+    label: str
+
+
+class Speed(Enum):
+    NORMAL = SpeedData(1, "1x")
+    FAST = SpeedData(4, "4x")
+    INSTANT = SpeedData(None, "Instant")
+
+    def next(self) -> Self:
+        speeds = list(Speed)
+        return speeds[(speeds.index(self) + 1) % len(speeds)]
+
+
+class Scheduler:
+    """
+    Runs Board.update on a fixed logical timestep, so game time keeps pace with the wall clock however long frames take
+    to draw, and can run faster than it.
+    The logical clock counts in frames of the target frame rate, the same units animations are timed in.
+    """
+    def __init__(self, frames_per_second: int = 50, frames_per_update: int = 15):
+        self.frames_per_second = frames_per_second
+        self.frames_per_update = frames_per_update
+        self.frame: float = 0
+        self.accumulator: float = 0  # Logical frames since the last update
+
+    def start(self, frame: float):
+        "Lines the logical clock up with the frame the play phase starts on"
+        self.frame = frame
+        self.accumulator = 0
+
+    def advance(self, board: Board, seconds: float, speed: Speed) -> Iterator[bool]:
+        """
+        Moves the logical clock on by seconds of real time at speed, running an update for every step it passes and
+        yielding whether the update changed the board. Each update is timed at the logical frame its step ends on.
+        At instant speed updates keep coming until the caller stops asking, so the caller has to stop on its own.
+        """
+        if speed.value.multiplier is None:
+            while True:
+                self.frame += self.frames_per_update - self.accumulator
+                self.accumulator = 0
+                yield board.update(self.frame)
+
+        elapsed_frames = seconds * self.frames_per_second * speed.value.multiplier
+        self.frame += elapsed_frames
+        self.accumulator += elapsed_frames
+        while self.accumulator >= self.frames_per_update:
+            self.accumulator -= self.frames_per_update
+            yield board.update(self.frame - self.accumulator)
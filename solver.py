@@ -0,0 +1,207 @@
+"""
+Troop placement solver.
+
+Finds the set of ORANGE troops to place on a level's placeable squares that wins the level, and among winning sets the
+one that leaves the most troops for the next round, as ResultsScreen counts them. That's the winning set that loses the
+fewest troops, and among those the one that places the fewest.
+
+Only the opening placement is searched. The reinforcement pauses every ten updates are played straight through, so a
+level the solver can't win may still be winnable by adding troops mid-battle.
+
+    python solver.py LEVEL [--troops N] [--levels FILE] [--workers N] [--max-ticks T]
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from copy import deepcopy
+from itertools import combinations
+from math import inf
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+from board import Board
+from unit import Direction, Team, Unit, UnitType
+
+MEMO_LIMIT = 200_000  # Board states remembered per level by each worker before the memo starts over
+
+
+class Outcome(NamedTuple):
+    "How a board plays out from some state, counted from that state on"
+    orange_finished: int
+    apple_finished: int
+    orange_killed: int
+    ticks: int
+    terminated: bool
+
+
+class Placement(NamedTuple):
+    squares: Tuple[Tuple[int, int], ...]
+    next_round_troops: int
+    outcome: Outcome
+
+
+def terrain_key(board: Board) -> Hashable:
+    "Everything about the board that never changes during play"
+    return tuple((tile.rotation, tuple(tile.destination)) for row in board.tiles for tile in row)
+
+
+def play_out(board: Board, max_ticks: int, kill_bound: float, memo: Dict[int, Outcome]) -> Optional[Outcome]:
+    """
+    Plays the board until an update stops changing it. Returns None once ORANGE has lost kill_bound troops, since the
+    result can't beat the best one found so far.
+    Every state passed through is memoized by its state hash with how the game went from there, so a board that runs
+    into a state some earlier placement already reached is finished from the memo. A board that comes back to a state
+    it has been in is a loop, and the game never ends.
+    """
+    visited: List[Tuple[int, Tuple[int, int, int, int]]] = []
+    outcome = None
+
+    while True:
+        counters = (board.finished_units_by_team[Team.ORANGE], board.finished_units_by_team[Team.APPLE],
+                    board.units_killed_by_team[Team.ORANGE], board.updates)
+        if counters[2] >= kill_bound:
+            return None
+
+        key = board.get_state_hash()
+        if key in memo:
+            tail = memo[key]
+            if counters[3] + tail.ticks > max_ticks:
+                # The tail was recorded from a state reached sooner, and playing it from here runs out of ticks
+                return Outcome(*counters, False)
+            outcome = Outcome(counters[0] + tail.orange_finished, counters[1] + tail.apple_finished,
+                              counters[2] + tail.orange_killed, counters[3] + tail.ticks, tail.terminated)
+            break
+        if board.updates >= max_ticks:
+            # Out of ticks, but not known to loop, so nothing here is worth remembering
+            return Outcome(*counters, False)
+
+        visited.append((key, counters))
+        if not board.update(board.updates):
+            if board.repeated_state:
+                outcome = Outcome(*counters, False)
+            else:
+                outcome = Outcome(board.finished_units_by_team[Team.ORANGE], board.finished_units_by_team[Team.APPLE],
+                                  board.units_killed_by_team[Team.ORANGE], board.updates, True)
+            break
+
+    if len(memo) > MEMO_LIMIT:
+        memo.clear()
+    for key, counters in visited:
+        memo[key] = Outcome(outcome.orange_finished - counters[0], outcome.apple_finished - counters[1],
+                            outcome.orange_killed - counters[2], outcome.ticks - counters[3], outcome.terminated)
+    # The memo's tail or the last update can take the losses past the bound too
+    if outcome.orange_killed >= kill_bound:
+        return None
+    return outcome
+
+
+def place_troops(board: Board, squares: Tuple[Tuple[int, int], ...]) -> Board:
+    placed = deepcopy(board)
+    for row_idx, col_idx in squares:
+        placed.tiles[row_idx][col_idx].unit = Unit(UnitType.SOLDIER, Direction.RIGHT, Team.ORANGE)
+    placed.update_strength_defense(0)
+    return placed
+
+
+def is_win(outcome: Outcome) -> bool:
+    return outcome.terminated and outcome.orange_finished > outcome.apple_finished
+
+
+# Each worker process keeps a memo per level for as long as it lives
+memos: Dict[Hashable, Dict[int, Outcome]] = {}
+
+
+def search_placements(board: Board, candidates: List[Tuple[int, int]], first_idx: int, troops: int, kill_bound: float,
+                      max_ticks: int) -> Tuple[Optional[Tuple[Tuple[int, int], ...]], Optional[Outcome], int]:
+    """
+    Tries every set of troops squares whose first square is candidates[first_idx].
+    Returns the best winning set, its outcome, and how many sets were played out.
+    """
+    memo = memos.setdefault(terrain_key(board), {})
+    best_squares, best_outcome = None, None
+    played = 0
+
+    for rest in combinations(candidates[first_idx + 1:], troops - 1):
+        squares = (candidates[first_idx],) + rest
+        outcome = play_out(place_troops(board, squares), max_ticks, kill_bound, memo)
+        played += 1
+        if outcome is not None and is_win(outcome) and \
+                (best_outcome is None or outcome.orange_killed < best_outcome.orange_killed):
+            best_squares, best_outcome = squares, outcome
+            kill_bound = outcome.orange_killed
+            if kill_bound == 0:
+                break
+    return best_squares, best_outcome, played
+
+
+def solve(board: Board, max_units: int, bonus_troops: int, max_ticks: int = 200, workers: Optional[int] = None) -> \
+        Tuple[Optional[Placement], int]:
+    """
+    Returns the best winning placement, or None if no placement wins, and how many placements were played out.
+    Sets are searched from fewest troops up, each size fanned out over a process pool by its first square. The search
+    stops at the first size with a win that loses no troops, as no bigger set can beat it.
+    """
+    candidates = [
+        (row_idx, col_idx)
+        for row_idx, row in enumerate(board.tiles)
+        for col_idx, tile in enumerate(row)
+        if tile.is_placeable and tile.is_free()
+    ]
+    troops_available = max_units - board.get_number_of_units_by_team(Team.ORANGE)
+
+    best = None
+    played = 0
+
+    def consider(squares: Tuple[Tuple[int, int], ...], outcome: Optional[Outcome]):
+        nonlocal best
+        if outcome is None or not is_win(outcome):
+            return
+        placement = Placement(squares, max_units + bonus_troops - outcome.orange_killed, outcome)
+        if best is None or placement.next_round_troops > best.next_round_troops:
+            best = placement
+
+    consider((), play_out(place_troops(board, ()), max_ticks, inf, {}))
+    played += 1
+
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for troops in range(1, min(troops_available, len(candidates)) + 1):
+            if best is not None and best.outcome.orange_killed == 0:
+                break
+            kill_bound = best.outcome.orange_killed if best is not None else inf
+            futures = [
+                executor.submit(search_placements, board, candidates, first_idx, troops, kill_bound, max_ticks)
+                for first_idx in range(len(candidates) - troops + 1)
+            ]
+            for future in futures:
+                squares, outcome, task_played = future.result()
+                consider(squares, outcome)
+                played += task_played
+
+    return best, played
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find the placement of troops that wins a level losing the fewest")
+    parser.add_argument("level", type=int, help="Level number, counting from 1")
+    parser.add_argument("--troops", type=int, default=2, help="Troops available, GameState.max_units")
+    parser.add_argument("--levels", default="new_levels.json")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, one per core by default")
+    parser.add_argument("--max-ticks", type=int, default=200)
+    args = parser.parse_args()
+
+    from savedata import load_levels
+
+    level = load_levels(args.levels)[args.level - 1]
+    best, played = solve(level.board, args.troops, level.bonus_troops, args.max_ticks, args.workers)
+
+    print(f"Level {args.level} {level.name!r}: {played} placements played out")
+    if best is None:
+        print(f"No placement of up to {args.troops} troops wins")
+        raise SystemExit(1)
+    print(f"Place troops on {list(best.squares)}")
+    print(f"Wins after {best.outcome.ticks} ticks, losing {best.outcome.orange_killed} troops, "
+          f"{best.next_round_troops} troops for the next round")
+
+
+if __name__ == "__main__":
+    main()
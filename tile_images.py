@@ -1,59 +1,183 @@
+"""
+Tile, sprite and overlay images, loaded the first time one of them is used.
+
+Images are scaled once and packed into atlas surfaces, one per sheet, and the names below are subsurfaces of them. The
+board sheet covers everything drawn from the first frame. The dialogue sheet holds the large portraits and overlays and
+is only loaded once a dialogue is shown. Atlases made after the display is up are converted to its pixel format, so
+blits don't convert pixels every frame. Each packed sheet is cached as raw pixels under resources/cache, and rebuilt
+from the PNGs whenever one of them changes.
+"""
+import json
+import os
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
 import pygame
 
 from constants import TILE_SIZE
 
+CACHE_FOLDER = "resources/cache"
+CACHE_VERSION = 1
+ATLAS_WIDTH = 512
+
+
+class ImageSource(NamedTuple):
+    folder: str
+    name: str
+    size: Optional[Tuple[int, int]]  # Scaled to this size, or
+    scale: int = 1  # multiplied by this when size is None
+    flipped: bool = False  # Mirrored left to right
+
+
+def tile_image(name: str) -> ImageSource:
+    return ImageSource("tiles", name, (TILE_SIZE, TILE_SIZE))
+
+
+def button_image(name: str) -> ImageSource:
+    return ImageSource("button", name, (TILE_SIZE, TILE_SIZE))
+
+
+def sprite_image(name: str) -> ImageSource:
+    return ImageSource("sprite", name, None, 4)
+
+
+def overlay_image(name: str) -> ImageSource:
+    return ImageSource("overlays", name, None, 6)
+
 
-def get_load_image_type(type: str):
-    def load_image_type(name: str) -> pygame.Surface:
-        raw_img = pygame.image.load(f"resources/{type}/{name}.png")
-        return pygame.transform.scale(raw_img, (TILE_SIZE, TILE_SIZE))
+SHEETS: Dict[str, Dict[str, ImageSource]] = {
+    "board": {
+        "GRASS_IMAGE": tile_image("grass"),
+        "WATER_IMAGE": tile_image("water"),
+        "TRAMPOLINE_BACKSLASH": tile_image("trampoline_backslash"),
+        "TRAMPOLINE_SLASH": tile_image("trampoline_slash"),
+        "TRAMPOLINE_SLASH_FLIPPED": tile_image("trampoline_slash")._replace(flipped=True),
+        "FINISH_LINE_IMAGE": tile_image("finish_line"),
+        "GRAVESTONE_IMAGE": tile_image("gravestone"),
+        "BROKEN_GRAVESTONE_IMAGE": tile_image("broken_gravestone"),
+        "LAVA_IMAGE": tile_image("lava"),
 
-    return load_image_type
+        "ORANGE_IMAGE": sprite_image("orange"),
+        "ORANGE_TROOP_IMAGE": sprite_image("orange_troop"),
+        "ORANGE_SUPER_TROOP_IMAGE": sprite_image("orange_super_troop"),
+        "ORANGE_TANK_IMAGE": sprite_image("orange_tank"),
+        "APPLE_IMAGE": sprite_image("apple"),
+        "APPLE_TROOP_IMAGE": sprite_image("apple_troop"),
+        "APPLE_SUPER_TROOP_IMAGE": sprite_image("apple_super_troop"),
+        "APPLE_TANK_IMAGE": sprite_image("apple_tank"),
 
+        "ROTATE_CW_IMAGE": sprite_image("rotate_cw"),
+        "ROTATE_CCW_IMAGE": sprite_image("rotate_ccw"),
 
-load_tile_image = get_load_image_type("tiles")
-load_button_image = get_load_image_type("button")
+        "PLAY_IMAGE": button_image("play_button"),
 
+        "ORANGE_BG": sprite_image("orange_bg"),
+    },
+    "dialogue": {
+        "GENERAL_IMAGE": sprite_image("general"),
+        "GENERAL_APPLE_IMAGE": sprite_image("apple_general"),
 
-def load_sprite_image(name: str) -> pygame.Surface:
-    raw_img = pygame.image.load(f"resources/sprite/{name}.png")
-    length, width = raw_img.get_size()
-    return pygame.transform.scale(raw_img, (length*4, width*4))
+        "DEFENSE_OVERLAY": overlay_image("defense"),
+        "OFFENSE_OVERLAY": overlay_image("offense"),
+    },
+}
+SHEET_BY_IMAGE: Dict[str, str] = {name: sheet for sheet, sources in SHEETS.items() for name in sources}
 
-def load_overlay_image(name: str) -> pygame.Surface:
-    raw_img = pygame.image.load(f"resources/overlays/{name}.png")
-    length, width = raw_img.get_size()
-    return pygame.transform.scale(raw_img, (length*6, width*6))
+images: Dict[str, pygame.Surface] = {}
 
 
-GRASS_IMAGE = load_tile_image("grass")
-WATER_IMAGE = load_tile_image("water")
-TRAMPOLINE_BACKSLASH = load_tile_image("trampoline_backslash")
-TRAMPOLINE_SLASH = load_tile_image("trampoline_slash")
-FINISH_LINE_IMAGE = load_tile_image("finish_line")
-GRAVESTONE_IMAGE = load_tile_image("gravestone")
-BROKEN_GRAVESTONE_IMAGE = load_tile_image("broken_gravestone")
-LAVA_IMAGE = load_tile_image("lava")
+def get_source_path(source: ImageSource) -> str:
+    return f"resources/{source.folder}/{source.name}.png"
 
-ORANGE_IMAGE = load_sprite_image("orange")
-ORANGE_TROOP_IMAGE = load_sprite_image("orange_troop")
-ORANGE_SUPER_TROOP_IMAGE = load_sprite_image("orange_super_troop")
-ORANGE_TANK_IMAGE = load_sprite_image("orange_tank")
-APPLE_IMAGE = load_sprite_image("apple")
-APPLE_TROOP_IMAGE = load_sprite_image("apple_troop")
-APPLE_SUPER_TROOP_IMAGE = load_sprite_image("apple_super_troop")
-APPLE_TANK_IMAGE = load_sprite_image("apple_tank")
 
-ROTATE_CW_IMAGE = load_sprite_image("rotate_cw")
-ROTATE_CCW_IMAGE = load_sprite_image("rotate_ccw")
+def load_scaled(source: ImageSource) -> pygame.Surface:
+    raw_img = pygame.image.load(get_source_path(source))
+    size = source.size
+    if size is None:
+        length, width = raw_img.get_size()
+        size = (length * source.scale, width * source.scale)
+    image = pygame.transform.scale(raw_img, size)
+    return pygame.transform.flip(image, True, False) if source.flipped else image
 
 
-GENERAL_IMAGE = load_sprite_image("general")
-GENERAL_APPLE_IMAGE = load_sprite_image("apple_general")
+def pack(sizes: Dict[str, Tuple[int, int]]) -> Tuple[Tuple[int, int], Dict[str, List[int]]]:
+    "Lays the images out in shelves, tallest first. Returns the atlas size and each image's rect"
+    rects = {}
+    x, y, shelf_height = 0, 0, 0
+    for name, (width, height) in sorted(sizes.items(), key=lambda item: -item[1][1]):
+        if x + width > ATLAS_WIDTH:
+            x, y = 0, y + shelf_height
+            shelf_height = 0
+        rects[name] = [x, y, width, height]
+        x += width
+        shelf_height = max(shelf_height, height)
+    return (ATLAS_WIDTH, y + shelf_height), rects
 
-PLAY_IMAGE = load_button_image("play_button")
 
-ORANGE_BG = load_sprite_image("orange_bg")
+def get_cache_file(sheet: str) -> str:
+    return f"{CACHE_FOLDER}/{sheet}.bin"
+
+
+def get_cache_key(sheet: str) -> list:
+    "Changes whenever a source image, the tile size or the cache layout does"
+    sources = []
+    for name, source in SHEETS[sheet].items():
+        stat = os.stat(get_source_path(source))
+        size = list(source.size) if source.size else None  # As it comes back from JSON
+        sources.append([name, get_source_path(source), size, source.scale, source.flipped, stat.st_size,
+                        stat.st_mtime_ns])
+    return [CACHE_VERSION, ATLAS_WIDTH, sources]
 
-DEFENSE_OVERLAY = load_overlay_image("defense")
-OFFENSE_OVERLAY = load_overlay_image("offense")
+
+def load_cached_atlas(sheet: str, cache_key: list) -> Optional[Tuple[pygame.Surface, Dict[str, List[int]]]]:
+    try:
+        with open(get_cache_file(sheet), "rb") as cache_file:
+            header = json.loads(cache_file.readline())
+            if header["Key"] != cache_key:
+                return None
+            atlas = pygame.image.frombytes(cache_file.read(), tuple(header["Size"]), "RGBA")
+    except (OSError, ValueError, KeyError):
+        return None
+    return atlas, header["Rects"]
+
+
+def save_cached_atlas(sheet: str, cache_key: list, atlas: pygame.Surface, rects: Dict[str, List[int]]):
+    from savedata import write_atomically
+
+    header = json.dumps({"Key": cache_key, "Size": atlas.get_size(), "Rects": rects}).encode() + b"\n"
+    try:
+        os.makedirs(CACHE_FOLDER, exist_ok=True)
+        write_atomically(get_cache_file(sheet), header + pygame.image.tobytes(atlas, "RGBA"))
+    except OSError:
+        pass  # A read-only install just rebuilds the atlas each run
+
+
+def build_atlas(sheet: str) -> Tuple[pygame.Surface, Dict[str, List[int]]]:
+    scaled = {name: load_scaled(source) for name, source in SHEETS[sheet].items()}
+    size, rects = pack({name: image.get_size() for name, image in scaled.items()})
+    atlas = pygame.Surface(size, pygame.SRCALPHA)
+    for name, image in scaled.items():
+        atlas.blit(image, rects[name][:2])
+    return atlas, rects
+
+
+def load_sheet(sheet: str):
+    cache_key = get_cache_key(sheet)
+    cached = load_cached_atlas(sheet, cache_key)
+    if cached is None:
+        cached = build_atlas(sheet)
+        save_cached_atlas(sheet, cache_key, *cached)
+    atlas, rects = cached
+
+    if pygame.display.get_surface() is not None:
+        atlas = atlas.convert_alpha()
+    sheet_images = {name: atlas.subsurface(rect) for name, rect in rects.items()}
+    images.update(sheet_images)
+    globals().update(sheet_images)  # Later lookups find the names directly, without coming back through __getattr__
+
+
+def __getattr__(name: str) -> pygame.Surface:
+    if name not in SHEET_BY_IMAGE:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    if name not in images:
+        load_sheet(SHEET_BY_IMAGE[name])
+    return images[name]
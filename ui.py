@@ -1,3 +1,4 @@
+from functools import lru_cache
 from typing import NamedTuple, List, Optional, Tuple
 
 import pygame
@@ -8,6 +9,12 @@ from constants import BUTTON_ACTIVE_BG, BUTTON_BG, BUTTON_TEXT_COLOR
 from gamestate import GameState
 
 
+@lru_cache(maxsize=256)
+def render_text(font: Font, text: str, antialias: bool, color: Tuple[int, int, int]) -> Surface:
+    "Renders a label once and hands back the same surface until its string changes. Don't draw onto the result"
+    return font.render(text, antialias, color)
+
+
 class Drawable:
     def draw(self, surface):
         raise NotImplemented()
@@ -19,12 +26,14 @@ class TextToggleButton(Drawable):
         self.text = text
         self.action = action
         self.active = False
+        self.font: Optional[Font] = None
 
     def draw(self, surface):
         color = BUTTON_ACTIVE_BG if self.active else BUTTON_BG
         pygame.draw.rect(surface, color, self.rect)
-        font = pygame.font.Font(None, 24)
-        text_surface = font.render(self.text, True, BUTTON_TEXT_COLOR)
+        if self.font is None:
+            self.font = pygame.font.Font(None, 24)
+        text_surface = render_text(self.font, self.text, True, BUTTON_TEXT_COLOR)
         text_rect = text_surface.get_rect(center=self.rect.center)
         surface.blit(text_surface, text_rect)
 
@@ -55,7 +64,7 @@ class TextButton(Drawable):
 
     def draw(self, surface):
         pygame.draw.rect(surface, (255, 255, 255), self.rect)
-        text_surface = self.font.render(self.text, True, BUTTON_TEXT_COLOR)
+        text_surface = render_text(self.font, self.text, True, BUTTON_TEXT_COLOR)
         text_rect = text_surface.get_rect(center=self.rect.center)
         surface.blit(text_surface, text_rect)
 
@@ -78,6 +87,10 @@ class GameScreen:
     def run(self, pos: Tuple[int], event: pygame.event.Event, game_state: GameState):
         pass
 
+    def get_dirty_rects(self, game_state: GameState) -> List[pygame.Rect]:
+        "The parts of the screen that change from one frame to the next when there's no input and no board update"
+        return []
+
 
 class RadioButtons(Drawable):
     def __init__(self):
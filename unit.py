@@ -1,13 +1,10 @@
 from copy import deepcopy
 from enum import Enum
-from typing import Self, Optional, NamedTuple, Tuple, Dict
+from typing import Self, Optional, NamedTuple, Tuple, Dict, List, TYPE_CHECKING
 
-import pygame
-from pygame import Surface
-
-from tile_images import FINISH_LINE_IMAGE, WATER_IMAGE, GRASS_IMAGE, ORANGE_IMAGE, ORANGE_TROOP_IMAGE, \
-    ORANGE_TANK_IMAGE, APPLE_IMAGE, TRAMPOLINE_SLASH, GRAVESTONE_IMAGE, BROKEN_GRAVESTONE_IMAGE, LAVA_IMAGE, \
-    APPLE_TROOP_IMAGE, APPLE_TANK_IMAGE, ORANGE_SUPER_TROOP_IMAGE, APPLE_SUPER_TROOP_IMAGE
+if TYPE_CHECKING:
+    import pygame
+    from pygame import Surface
 
 
 class Direction(Enum):
@@ -32,12 +29,54 @@ class Team(Enum):
 
 
 def get_image_by_team(team: Team):
+    from tile_images import ORANGE_IMAGE, ORANGE_TROOP_IMAGE, ORANGE_SUPER_TROOP_IMAGE, ORANGE_TANK_IMAGE, \
+        APPLE_IMAGE, APPLE_TROOP_IMAGE, APPLE_SUPER_TROOP_IMAGE, APPLE_TANK_IMAGE
+
     if team == Team.ORANGE:
         return [ORANGE_IMAGE, ORANGE_TROOP_IMAGE, ORANGE_SUPER_TROOP_IMAGE, ORANGE_TANK_IMAGE]
     elif team == Team.APPLE:
         return [APPLE_IMAGE, APPLE_TROOP_IMAGE, APPLE_SUPER_TROOP_IMAGE, APPLE_TANK_IMAGE]
 
 
+# Every team, rank and facing of the unit sprites, so drawing a unit never has to flip or rotate a surface
+unit_images: Dict[Tuple[Team, UnitType, Direction], "Surface"] = {}
+
+
+def orient_image(image: "Surface", team: Team, direction: Direction) -> "Surface":
+    import pygame
+
+    if team == Team.APPLE:
+        match direction:
+            case Direction.RIGHT:
+                return pygame.transform.flip(image, True, False)
+            case Direction.UP:
+                return pygame.transform.rotate(image, 270)
+            case Direction.DOWN:
+                return pygame.transform.rotate(image, 90)
+            case _:
+                return image
+    elif team == Team.ORANGE:
+        match direction:
+            case Direction.LEFT:
+                return pygame.transform.flip(image, True, False)
+            case Direction.UP:
+                return pygame.transform.rotate(image, 90)
+            case Direction.DOWN:
+                return pygame.transform.rotate(image, 270)
+            case _:
+                return image
+
+
+def load_unit_images():
+    # Sprites are only looked up when something draws a unit, so the game rules import without pygame
+    for team in Team:
+        image_list = get_image_by_team(team)
+        for unit_type in UnitType:
+            image = image_list[unit_type.value - 1]
+            for direction in Direction:
+                unit_images[(team, unit_type, direction)] = orient_image(image, team, direction)
+
+
 class Unit:
     def __init__(self, type: UnitType, direction: Direction, team: Team):
         self.type = type
@@ -67,35 +106,10 @@ class Unit:
             case _:
                 self.direction = Direction.DOWN
 
-    def get_image(self):
-        image_list = get_image_by_team(self.team)
-        try:
-             retval = image_list[self.type.value - 1]
-        except IndexError:
-            print("Uh Oh!! Time for moe ASSETTS")
-            print(image_list)
-            print(self.type)
-            retval = APPLE_IMAGE
-        if self.team == Team.APPLE:
-            match self.direction:
-                case Direction.RIGHT:
-                    return pygame.transform.flip(retval, True, False)
-                case Direction.UP:
-                    return pygame.transform.rotate(retval,270)
-                case Direction.DOWN:
-                    return pygame.transform.rotate(retval,90)
-                case _:
-                    return retval
-        elif self.team == Team.ORANGE:
-            match self.direction:
-                case Direction.LEFT:
-                    return pygame.transform.flip(retval, True, False)
-                case Direction.UP:
-                    return pygame.transform.rotate(retval, 90)
-                case Direction.DOWN:
-                    return pygame.transform.rotate(retval, 270)
-                case _:
-                    return retval
+    def get_image(self) -> "Surface":
+        if not unit_images:
+            load_unit_images()
+        return unit_images[(self.team, self.type, self.direction)]
 
     def serialize_unit(self) -> dict[str, int | str]:
         return {"Unit Rank": self.type.value, "Direction": self.direction.value, "Team": self.team.value}
@@ -128,42 +142,51 @@ class Unit:
 
 class TileTypeData(NamedTuple):
     is_passable: bool
-    image: pygame.Surface
+    image_name: str
     char_code: str
 
+    @property
+    def image(self) -> "pygame.Surface":
+        import tile_images
+        return getattr(tile_images, self.image_name)
+
 
 class TileType(Enum):
-    GRASS = TileTypeData(True, GRASS_IMAGE, "GRASS")
-    WATER = TileTypeData(False, WATER_IMAGE, "WATER")
-    TRAMPOLINE = TileTypeData(True, TRAMPOLINE_SLASH, "TRAMPOLINE")
-    WALL = TileTypeData(False, GRAVESTONE_IMAGE, "WALL")
-    DEADWALL = TileTypeData(True, BROKEN_GRAVESTONE_IMAGE, "REMAINS")
-    TRAPDOOR = TileTypeData(True, LAVA_IMAGE, "LAVA")
-    FINISH_LINE = TileTypeData(True, FINISH_LINE_IMAGE, "EXIT")
-    TUNNEL = TileTypeData(True, GRAVESTONE_IMAGE, "TUNNEL")
+    GRASS = TileTypeData(True, "GRASS_IMAGE", "GRASS")
+    WATER = TileTypeData(False, "WATER_IMAGE", "WATER")
+    TRAMPOLINE = TileTypeData(True, "TRAMPOLINE_SLASH", "TRAMPOLINE")
+    WALL = TileTypeData(False, "GRAVESTONE_IMAGE", "WALL")
+    DEADWALL = TileTypeData(True, "BROKEN_GRAVESTONE_IMAGE", "REMAINS")
+    TRAPDOOR = TileTypeData(True, "LAVA_IMAGE", "LAVA")
+    FINISH_LINE = TileTypeData(True, "FINISH_LINE_IMAGE", "EXIT")
+    TUNNEL = TileTypeData(True, "GRAVESTONE_IMAGE", "TUNNEL")
 
     @classmethod
     def from_str(cls, name: str):
-        for tile_type in TileType:
-            if tile_type.value.char_code == name:
-                return tile_type
-        match name:
-            case "W":
-                return TileType.WATER
-            case "T":
-                return TileType.TRAMPOLINE
-            case "L":
-                return TileType.WALL
-            case "D":
-                return TileType.DEADWALL
-            case "R":
-                return TileType.TRAPDOOR
-            case "F":
-                return TileType.FINISH_LINE
-            case "N":
-                return TileType.TUNNEL
-            case _:
-                return TileType.GRASS
+        return TILE_TYPES_BY_CODE.get(name, TileType.GRASS)
+
+
+# Tile type codes, the long names and the single letters older level files use. Anything else loads as grass.
+TILE_TYPES_BY_CODE: Dict[str, TileType] = {tile_type.value.char_code: tile_type for tile_type in TileType}
+TILE_TYPES_BY_CODE.update({"G": TileType.GRASS, "W": TileType.WATER, "T": TileType.TRAMPOLINE, "L": TileType.WALL,
+                           "D": TileType.DEADWALL, "R": TileType.TRAPDOOR, "F": TileType.FINISH_LINE,
+                           "N": TileType.TUNNEL})
+DIRECTIONS_BY_NAME: Dict[str, Direction] = {direction.value: direction for direction in Direction}
+
+
+class TerrainPrototype(NamedTuple):
+    "A tile without its unit. Loading makes one per distinct terrain and builds every matching tile from it"
+    type: TileType
+    is_placeable: bool
+    health: int
+    rotation: Direction
+    destination: List[int]
+
+
+# Keyed by the serialized fields, so a tile seen before skips parsing them
+terrain_prototypes: Dict[tuple, TerrainPrototype] = {}
+unit_prototypes: Dict[tuple, Tuple[UnitType, Direction, Team]] = {}
+
 
 class Tile:
     def __init__(self, type: TileType, unit: Optional[Unit], is_placeable: bool = True, health:int = 5,
@@ -179,13 +202,14 @@ class Tile:
         "Returns whether the tile is clear to walk on, based on tile type and other units on it"
         return self.type.value.is_passable and self.unit is None
 
-    def render(self, screen: Surface, tile_x, tile_y):
+    def render(self, screen: "Surface", tile_x, tile_y):
         match self.type:
             case TileType.TRAMPOLINE:
                 if self.rotation == Direction.RIGHT or self.rotation == Direction.LEFT:
                     screen.blit(self.type.value.image, (tile_x, tile_y))
                 else:
-                    screen.blit(pygame.transform.flip(self.type.value.image, True, False), (tile_x, tile_y))
+                    from tile_images import TRAMPOLINE_SLASH_FLIPPED
+                    screen.blit(TRAMPOLINE_SLASH_FLIPPED, (tile_x, tile_y))
             case _:
                 screen.blit(self.type.value.image, (tile_x, tile_y))
 
@@ -234,10 +258,29 @@ class Tile:
 
     @classmethod
     def from_serialized(cls, serialized_data: Dict[str, Optional[Dict[str, int | str]] | bool | int | str | Tuple[int]]) -> Self:
-        unit_from_serial = None
-        if serialized_data["Unit Data"] is not None:
-            unit_from_serial = Unit.from_serialized(serialized_data["Unit Data"])
-        return Tile(TileType.from_str(serialized_data["Tile Type"]), unit_from_serial, serialized_data["Player Placeable"], serialized_data["Wall Health"], Direction(serialized_data["Rotation"]), serialized_data["Teleport Destination"])
+        destination = serialized_data["Teleport Destination"]
+        terrain_key = (serialized_data["Tile Type"], serialized_data["Player Placeable"], serialized_data["Wall Health"],
+                       serialized_data["Rotation"], *destination)
+        terrain = terrain_prototypes.get(terrain_key)
+        if terrain is None:
+            terrain = terrain_prototypes[terrain_key] = TerrainPrototype(
+                TileType.from_str(terrain_key[0]), terrain_key[1], terrain_key[2], DIRECTIONS_BY_NAME[terrain_key[3]],
+                destination)
+        tile_type, is_placeable, health, rotation, destination = terrain
+
+        unit = None
+        unit_data = serialized_data["Unit Data"]
+        if unit_data is not None:
+            unit_key = (unit_data["Unit Rank"], unit_data["Direction"], unit_data["Team"])
+            unit_fields = unit_prototypes.get(unit_key)
+            if unit_fields is None:
+                unit_fields = unit_prototypes[unit_key] = (
+                    UnitType(unit_key[0]), DIRECTIONS_BY_NAME[unit_key[1]], Team(unit_key[2]))
+            unit = Unit(*unit_fields)
+
+        # Tiles are edited in place, so each gets its own. Destinations are only ever replaced, never changed in
+        # place, so tiles share them the same way Board.update does.
+        return Tile(tile_type, unit, is_placeable, health, rotation, destination)
 
     def __eq__(self, other: Self):
         return other is not None and (
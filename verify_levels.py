@@ -0,0 +1,87 @@
+"""
+Batch level verification.
+
+Loads every level in a level file and plays each board out headlessly, as it would run once the player hits play with
+no troops added, fanning the boards out over a process pool. Reports how many ticks each board took to settle, who won,
+and the kills on each side, and flags boards that loop or are still changing after the tick limit.
+
+    python verify_levels.py [--levels FILE] [--workers N] [--max-ticks T]
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, NamedTuple, Optional
+
+from board import Board
+from unit import Team
+
+
+class LevelResult(NamedTuple):
+    ticks: int
+    terminated: bool
+    looped: bool  # The board came back to a state it had already been in, so it would never have terminated
+    winner: Optional[Team]  # None for a draw, including boards that never finish
+    kills_by_team: Dict[Team, int]  # Units each team lost
+    finished_by_team: Dict[Team, int]
+
+
+def run_board(board: Board, max_ticks: int) -> LevelResult:
+    "Updates the board until an update stops changing it, without the reinforcement pauses the game makes"
+    terminated = False
+    while board.updates < max_ticks:
+        if not board.update(board.updates):
+            terminated = not board.repeated_state
+            break
+
+    orange_finished = board.finished_units_by_team[Team.ORANGE]
+    apple_finished = board.finished_units_by_team[Team.APPLE]
+    winner = None
+    if terminated and orange_finished != apple_finished:
+        winner = Team.ORANGE if orange_finished > apple_finished else Team.APPLE
+
+    return LevelResult(board.updates, terminated, board.repeated_state, winner, dict(board.units_killed_by_team),
+                       dict(board.finished_units_by_team))
+
+
+def verify_boards(boards: list, max_ticks: int, workers: Optional[int] = None) -> list:
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return [run_board(board, max_ticks) for board in boards]
+    # A few chunks per worker keeps every core busy even when a handful of boards run much longer than the rest
+    chunksize = max(1, len(boards) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(run_board, boards, [max_ticks] * len(boards), chunksize=chunksize))
+
+
+def describe(level_idx: int, name: str, result: LevelResult) -> str:
+    kills = ", ".join(f"{team.value} {result.kills_by_team[team]}" for team in Team)
+    if result.looped:
+        return f"Level {level_idx + 1} {name!r}: LOOPS back to an earlier state after {result.ticks} ticks (kills: {kills})"
+    if not result.terminated:
+        return f"Level {level_idx + 1} {name!r}: DID NOT TERMINATE after {result.ticks} ticks (kills: {kills})"
+    winner = result.winner.value if result.winner is not None else "Draw"
+    return f"Level {level_idx + 1} {name!r}: {result.ticks} ticks, winner {winner} (kills: {kills})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play out every level headlessly and report how each one ends")
+    parser.add_argument("--levels", default="new_levels.json")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes, one per core by default")
+    parser.add_argument("--max-ticks", type=int, default=1000)
+    args = parser.parse_args()
+
+    from savedata import load_levels
+
+    levels = load_levels(args.levels)
+    results = verify_boards([level.board for level in levels], args.max_ticks, args.workers)
+
+    for level_idx, (level, result) in enumerate(zip(levels, results)):
+        print(describe(level_idx, level.name, result))
+
+    non_terminating = sum(not result.terminated for result in results)
+    print(f"{len(levels)} levels checked, {non_terminating} did not terminate")
+    raise SystemExit(1 if non_terminating else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+from typing import List
+
+from unit import Direction, Team, Tile, TileType, Unit
+
+MASK = (1 << 64) - 1
+
+TEAM_CODES = {team: code for code, team in enumerate(Team)}
+DIRECTION_CODES = {direction: code for code, direction in enumerate(Direction)}
+TILE_TYPE_CODES = {tile_type: code for code, tile_type in enumerate(TileType)}
+
+UNIT_FEATURE = 0
+TERRAIN_FEATURE = 1
+
+
+def mix(value: int) -> int:
+    "The splitmix64 finalizer, which spreads every input bit over the whole 64-bit output"
+    value = (value ^ (value >> 30)) * 0xBF58476D1CE4E5B9 & MASK
+    value = (value ^ (value >> 27)) * 0x94D049BB133111EB & MASK
+    return value ^ (value >> 31)
+
+
+def zobrist_key(*parts: int) -> int:
+    """
+    A random-looking 64-bit key for one feature of one square. Keys are computed rather than drawn from a table, so
+    boards of any size get the same keys on every run.
+    """
+    key = 0x9E3779B97F4A7C15
+    for part in parts:
+        key = mix(key ^ (part & MASK))
+    return key
+
+
+def unit_key(row_idx: int, col_idx: int, unit: Unit) -> int:
+    return zobrist_key(UNIT_FEATURE, row_idx, col_idx, TEAM_CODES[unit.team], DIRECTION_CODES[unit.direction])
+
+
+def terrain_key(row_idx: int, col_idx: int, tile: Tile) -> int:
+    return zobrist_key(TERRAIN_FEATURE, row_idx, col_idx, TILE_TYPE_CODES[tile.type], tile.health)
+
+
+def board_hash(tiles: List[List[Tile]]) -> int:
+    """
+    XOR of the keys for every square's terrain and unit. A unit's rank and defense aren't hashed, since both follow
+    from where the units stand.
+    """
+    state_hash = 0
+    for row_idx, row in enumerate(tiles):
+        for col_idx, tile in enumerate(row):
+            state_hash ^= terrain_key(row_idx, col_idx, tile)
+            if tile.unit is not None:
+                state_hash ^= unit_key(row_idx, col_idx, tile.unit)
+    return state_hash